@@ -0,0 +1,208 @@
+# bench_dashboard_load.py
+
+"""
+Concurrent-session load test for the stock dashboard.
+
+Writes a synthetic result workbook of the requested size to a scratch folder
+and drives N headless dashboard sessions (Streamlit's AppTest) at once. Each
+session clicks through random make filters, checkboxes, sort options and
+searches, and every rerun is timed. Reports p50/p95/max rerun latency overall
+and per action, plus the memory each session holds on top of the shared
+snapshot, so dashboard changes can be compared run against run.
+
+AppTest keeps process-global state and is not safe to drive from several
+threads, so each session runs in its own worker process, all released
+together by a barrier. Sessions therefore compete for CPU but not for one
+interpreter lock as they do in the server, which makes the latencies a lower
+bound. AppTest cannot drive custom components either, so the streamlit_pills
+make filter is replaced by a radio with the same label and options.
+
+Usage:
+    python bench_dashboard_load.py [sessions] [actions] [rows] [dashboard_script]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from stock_export import write_stock_workbook
+from stock_query import prepare_data
+from stock_snapshot import shared_provider
+
+# ================================
+# Constants and Configuration
+# ================================
+
+DASHBOARD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+RESULT_FILE = 'used_stock_data.xlsx'
+
+# Seconds a single rerun may take before AppTest gives up
+RERUN_TIMEOUT = 120
+
+MAKE_OPTIONS = ["ALL", "BMW", "KAW", "KTM", "OTHER"]
+SYNTHETIC_MAKES = ['BMW', 'KAWASAKI', 'KTM', 'DUCATI', 'TRIUMPH', 'HONDA']
+SYNTHETIC_MODELS = ['S1000RR', 'R1250GS', 'NINJA 400', 'Z900', '390 DUKE', '1290 SUPER ADVENTURE', 'PANIGALE V4']
+SYNTHETIC_STATUSES = ['', 'Transfer rego', 'Create listing', 'Transfer rego; Create listing']
+
+# ================================
+# Synthetic Workbook
+# ================================
+
+def synthetic_stock(rows, seed=0):
+    """Build a cleaned-stock frame of the given size with realistic value mixes."""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+
+    def dates(low, high, missing):
+        values = pd.Series(today + pd.to_timedelta(rng.integers(low, high, rows), unit='D'))
+        return values.mask(rng.random(rows) < missing)
+
+    plates = pd.Series([f'{"".join(rng.choice(list("ABCDEFGHJKLMNPRSTUVWXYZ"), 3))}{n:02d}'
+                        for n in rng.integers(0, 100, rows)])
+    return pd.DataFrame({
+        'Stock Number': [f'U{n:05d}' for n in range(rows)],
+        'Date Into Stock': dates(-700, 0, 0),
+        'Make': rng.choice(SYNTHETIC_MAKES, rows),
+        'Model': rng.choice(SYNTHETIC_MODELS, rows),
+        'LAMS?': rng.choice(['Yes', 'No', ''], rows),
+        'VIN': [f'WB10{n:013d}' for n in range(rows)],
+        'Rego Number': plates.mask(rng.random(rows) < 0.2, ''),
+        'Rego Expiry': dates(-60, 365, 0.2),
+        'Rego Details': rng.choice(['', 'No rego found', 'Rego not under Procycles'], rows),
+        'Date Listed': dates(-200, 0, 0.3),
+        'Listed Price': pd.Series(rng.integers(3000, 40000, rows).astype(float)).mask(rng.random(rows) < 0.3),
+        'Status': rng.choice(SYNTHETIC_STATUSES, rows),
+    })
+
+# ================================
+# Sessions
+# ================================
+
+def install_pills_radio():
+    """Replace the streamlit_pills component with a radio AppTest can set."""
+    module = types.ModuleType('streamlit_pills')
+    module.pills = lambda label, options, *args, **kwargs: st.radio(label, options)
+    sys.modules['streamlit_pills'] = module
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+def random_action(at, rng, stock_numbers, plates):
+    """Apply one random interaction to a session and return its name."""
+    action = rng.choice(['make', 'checkbox', 'sort', 'order', 'stock search', 'rego search', 'clear search'])
+    if action == 'make':
+        widget(at.radio, "Filter by Make").set_value(rng.choice(MAKE_OPTIONS))
+    elif action == 'checkbox':
+        checkbox = rng.choice(list(at.checkbox))
+        checkbox.set_value(not checkbox.value)
+    elif action == 'sort':
+        widget(at.selectbox, "Sort By").set_value(rng.choice(["Date Into Stock", "Rego Expiry", "Date Listed"]))
+    elif action == 'order':
+        widget(at.radio, "Sort Order").set_value(rng.choice(["Newest first", "Oldest first"]))
+    elif action == 'stock search':
+        widget(at.text_input, "Search by Stock Number").set_value(rng.choice(stock_numbers)[:rng.randint(2, 6)])
+    elif action == 'rego search':
+        widget(at.text_input, "Search by Rego Number").set_value(rng.choice(plates)[:rng.randint(2, 5)])
+    else:
+        widget(at.text_input, "Search by Stock Number").set_value('')
+        widget(at.text_input, "Search by Rego Number").set_value('')
+    return action
+
+def run_session(script, folder, actions, seed, start_barrier, results):
+    """Worker process: drive one session through its random interactions, timing every rerun.
+
+    Puts (timings, memory, error) on the results queue.
+    """
+    rng = random.Random(seed)
+    timings = []
+    memory = None
+    try:
+        install_pills_radio()
+        os.chdir(folder)  # The dashboard reads the result file from the working directory
+
+        # Load the snapshot the server would share between sessions, then measure the session alone
+        df = shared_provider(RESULT_FILE, prepare_data).get().data[0]
+        stock_numbers = df['Stock Number'].astype(str).tolist()
+        plates = [plate for plate in df['Rego Number'].dropna().astype(str) if plate]
+        tracemalloc.start()
+        at = AppTest.from_file(script, default_timeout=RERUN_TIMEOUT).run()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start_barrier.wait()
+        for _ in range(actions):
+            action = random_action(at, rng, stock_numbers, plates)
+            start = time.perf_counter()
+            at.run()
+            timings.append((action, time.perf_counter() - start))
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+    except Exception as e:
+        start_barrier.abort()
+        results.put((timings, memory, repr(e)))
+        return
+    results.put((timings, memory, None))
+
+# ================================
+# Report
+# ================================
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main(sessions=8, actions=25, rows=20000, script=DASHBOARD_SCRIPT):
+    script = os.path.abspath(script)
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        write_stock_workbook(synthetic_stock(rows), os.path.join(folder, RESULT_FILE))
+        print(f"Synthetic workbook: {rows} rows written in {time.perf_counter() - start:.1f}s")
+
+        start_barrier = context.Barrier(sessions)
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_session, args=(script, folder, actions, seed, start_barrier, results))
+            for seed in range(sessions)
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    timings = [timing for session_timings, _, _ in outcomes for timing in session_timings]
+    memory = [session_memory for _, session_memory, _ in outcomes if session_memory is not None]
+    errors = [error for _, _, error in outcomes if error]
+    if errors:
+        print(f"Session errors ({len(errors)}): {errors[0]}")
+    if not timings:
+        return
+    latencies = [seconds for _, seconds in timings]
+    print(f"Sessions:          {sessions} concurrent, {len(timings)} reruns")
+    print(f"Rerun latency:     p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms")
+    print(f"Memory/session:    {sum(memory) / len(memory) / 1024:.0f} KB on top of the shared snapshot")
+    print("Per action:")
+    for action in sorted({action for action, _ in timings}):
+        values = [seconds for name, seconds in timings if name == action]
+        print(f"  {action:<13} {len(values):4d} reruns  p50 {percentile(values, 0.5) * 1000:6.0f} ms  "
+              f"p95 {percentile(values, 0.95) * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    sessions_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    actions_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    rows_arg = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+    script_arg = sys.argv[4] if len(sys.argv) > 4 else DASHBOARD_SCRIPT
+    main(sessions_arg, actions_arg, rows_arg, script_arg)
@@ -0,0 +1,99 @@
+# bench_query_backend.py
+
+"""
+Benchmark the dashboard's pandas and SQLite query backends.
+
+For each snapshot size a synthetic stock frame is preprocessed as the
+dashboard loads it, then both backends answer the same random sidebar
+queries: the pandas path filters the whole frame and slices the page, the
+SQLite path runs a COUNT and a LIMIT/OFFSET page query. Every page is checked
+to be identical between the two. Reports the one-off build time (sort index,
+plus the SQLite table and its indexes) and the p50/p95 query latency.
+
+Usage:
+    python bench_query_backend.py [queries] [rows ...]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from bench_dashboard_load import MAKE_OPTIONS, synthetic_stock
+from stock_query import SORT_COLUMNS, build_sort_index, filter_positions, preprocess_data
+from stock_schema import apply_schema
+from stock_sql import StockDatabase
+
+# ================================
+# Constants and Configuration
+# ================================
+
+SNAPSHOT_ROWS = [1000, 50000, 500000]
+PAGE_SIZE = 50
+
+# ================================
+# Queries
+# ================================
+
+def random_filters(rng, df):
+    """Return one random set of sidebar choices: filters, searches and sort."""
+    stock_number = rng.choice([''] * 3 + [df['Stock Number'].iloc[rng.randrange(len(df))][:rng.randint(2, 6)]])
+    rego_number = rng.choice([''] * 3 + [df['Rego Number'].iloc[rng.randrange(len(df))][:rng.randint(2, 4)]])
+    return (rng.choice(MAKE_OPTIONS), rng.random() < 0.3, rng.random() < 0.3, rng.random() < 0.3,
+            stock_number, rego_number, rng.choice(list(SORT_COLUMNS)), rng.choice(["Newest first", "Oldest first"]))
+
+def pandas_page(df, sort_index, filters, page):
+    positions = filter_positions(df, sort_index, *filters)
+    return len(positions), positions[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+
+def sqlite_page(database, filters, page):
+    return database.count(*filters), database.positions(*filters, limit=PAGE_SIZE, offset=page * PAGE_SIZE)
+
+# ================================
+# Report
+# ================================
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def bench_size(rows, queries, seed=0):
+    df = preprocess_data(apply_schema(synthetic_stock(rows, seed)))
+
+    start = time.perf_counter()
+    sort_index = build_sort_index(df)
+    pandas_build = time.perf_counter() - start
+    start = time.perf_counter()
+    database = StockDatabase(df, sort_index)
+    sqlite_build = pandas_build + time.perf_counter() - start
+
+    rng = random.Random(seed)
+    timings = {'pandas': [], 'sqlite': []}
+    for _ in range(queries):
+        filters = random_filters(rng, df)
+        page = rng.choice([0, 0, 1, 5])
+        start = time.perf_counter()
+        expected = pandas_page(df, sort_index, filters, page)
+        timings['pandas'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        actual = sqlite_page(database, filters, page)
+        timings['sqlite'].append(time.perf_counter() - start)
+        if expected[0] != actual[0] or not np.array_equal(expected[1], actual[1]):
+            raise AssertionError(f"Backends disagree for {filters} page {page}")
+
+    print(f"{rows} rows:")
+    for backend, build in [('pandas', pandas_build), ('sqlite', sqlite_build)]:
+        values = timings[backend]
+        print(f"  {backend:<7} build {build * 1000:8.1f} ms   query p50 {percentile(values, 0.5) * 1000:7.2f} ms  "
+              f"p95 {percentile(values, 0.95) * 1000:7.2f} ms")
+
+def main(queries=200, sizes=SNAPSHOT_ROWS):
+    for rows in sizes:
+        bench_size(rows, queries)
+
+
+if __name__ == "__main__":
+    queries_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sizes_arg = [int(arg) for arg in sys.argv[2:]] or SNAPSHOT_ROWS
+    main(queries_arg, sizes_arg)
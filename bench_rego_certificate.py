@@ -0,0 +1,146 @@
+# bench_rego_certificate.py
+
+"""
+Benchmark the lightweight first-page certificate extractor against PyPDF2.
+
+Runs both extractors over every PDF in a folder (the RMS certificate share by
+default), checks that they produce identical certificate fields and reports
+the per-certificate parse time of each.
+
+Before the timing run, both extractors are checked against hand-written
+certificates in the RMS layout whose holder names carry the parentheses
+seen on the share: balanced ones left unescaped ('PROCYCLES (HORNSBY) PTY
+LTD'), escaped ones, octal escapes and names split across a TJ array.
+
+Usage:
+    python bench_rego_certificate.py [folder] [repeats]
+"""
+
+import os
+import sys
+import time
+
+from rego_certificate import first_page_lines, parse_rego_lines, pypdf2_first_page_lines
+
+REGO_CERT_FOLDER = 'R:/UserData/St Peters RMS Work'
+
+PLATE = 'HJA62'
+EXPIRY = '01-02-2026'
+
+# Holder name operands as written in the content stream, with the name they show
+LAYOUT_NAMES = [
+    (rb'( PROCYCLES (HORNSBY) PTY LTD) Tj', 'PROCYCLES (HORNSBY) PTY LTD'),
+    (rb'( BIKE WORLD \(NSW\)) Tj', 'BIKE WORLD (NSW)'),
+    (rb'( J SMITH \050TRADING\051) Tj', 'J SMITH (TRADING)'),
+    (rb'[( MOTO (CITY \(WEST\))) -120 ( PTY LTD)] TJ', 'MOTO (CITY (WEST)) PTY LTD'),
+    (rb'( ((A) (B)) MOTORS\\) Tj', '((A) (B)) MOTORS\\'),
+]
+
+
+def layout_certificate(name_operands, lams):
+    """Return a one-page certificate PDF with the holder name drawn by name_operands."""
+    lines = [b'NSW GOVERNMENT', b'Transport for NSW', b'Certificate of Registration',
+             PLATE.encode() + b' MOTOR CYCLE', b'VIN JKAZX4J17KA012345', b'Engine ZX636EE012345',
+             b'Registered Operator', None, b'12 EXAMPLE STREET', b'ST PETERS NSW 2044',
+             b'Registration Period', b'Expiry ' + EXPIRY.encode(), b'Issued 01-02-2025',
+             b'Tare 196', b'Conditions',
+             b'LA. LEARNER APPROVED' if lams else b'NIL', b'Receipt 123456', b'Page 1 of 1']
+    content = b'BT /F1 10 Tf 14 TL 50 780 Td\n'
+    for line in lines:
+        shown = b'(%s) Tj ' % PLATE.encode() + name_operands if line is None else b'(%s) Tj' % line
+        content += shown + b' T*\n'
+    content += b'ET\n'
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf
+
+
+def check_layouts():
+    """Check both extractors against the layout certificates; return the number of failures."""
+    failures = 0
+    for lams in (False, True):
+        for name_operands, name in LAYOUT_NAMES:
+            data = layout_certificate(name_operands, lams)
+            expected = {"rego_name": name, "is_lam": lams, "expiry_date": EXPIRY}
+            fast = parse_fields(first_page_lines, data)
+            full = parse_fields(pypdf2_first_page_lines, data)
+            if fast != expected or full != expected:
+                failures += 1
+                print(f"Layout check failed for {name_operands!r}:\n  expected: {expected}\n"
+                      f"  fast:     {fast}\n  PyPDF2:   {full}")
+    return failures
+
+
+def parse_fields(extract_lines, data):
+    """Return the certificate fields from one extractor, or the error name."""
+    try:
+        return parse_rego_lines(extract_lines(data))
+    except Exception as e:
+        return type(e).__name__
+
+
+def time_extractor(extract_lines, corpus, repeats):
+    """Return the mean seconds per certificate for an extractor."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for data in corpus.values():
+            parse_fields(extract_lines, data)
+    return (time.perf_counter() - start) / (repeats * len(corpus))
+
+
+def main(folder=REGO_CERT_FOLDER, repeats=3):
+    print(f"Layout checks failed: {check_layouts()} of {2 * len(LAYOUT_NAMES)}")
+
+    # Read the corpus up front so disk and network time are excluded
+    corpus = {}
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.lower().endswith('.pdf'):
+            with open(entry.path, 'rb') as file:
+                corpus[entry.name] = file.read()
+    if not corpus:
+        print(f"No PDF certificates found in {folder}")
+        return
+
+    # Field-by-field comparison
+    mismatches = 0
+    fallbacks = 0
+    for name, data in corpus.items():
+        fast = parse_fields(first_page_lines, data)
+        full = parse_fields(pypdf2_first_page_lines, data)
+        if isinstance(fast, str):
+            fallbacks += 1  # The fast path raised; extract_rego_info falls back to PyPDF2
+        elif fast != full:
+            mismatches += 1
+            print(f"Mismatch in {name}:\n  fast:   {fast}\n  PyPDF2: {full}")
+
+    fast_time = time_extractor(first_page_lines, corpus, repeats)
+    full_time = time_extractor(pypdf2_first_page_lines, corpus, repeats)
+
+    print(f"Certificates:       {len(corpus)}")
+    print(f"Field mismatches:   {mismatches}")
+    print(f"Fast path failures: {fallbacks}")
+    print(f"PyPDF2 path:        {full_time * 1000:.2f} ms/certificate")
+    print(f"Lightweight path:   {fast_time * 1000:.2f} ms/certificate")
+    print(f"Speed-up:           {full_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    folder_arg = sys.argv[1] if len(sys.argv) > 1 else REGO_CERT_FOLDER
+    repeats_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    main(folder_arg, repeats_arg)
@@ -0,0 +1,70 @@
+# bench_startup.py
+
+"""
+Benchmark the startup import cost of each clean_data.py subcommand.
+
+Each measurement runs in a fresh interpreter and times importing clean_data
+plus the heavy modules the subcommand's stages import when they run. The
+eager baseline imports every heavy dependency up front, as the scripts did
+before those imports were deferred to the stages that need them.
+
+Usage:
+    python bench_startup.py [repeats]
+"""
+
+import statistics
+import subprocess
+import sys
+
+# Heavy modules each subcommand's stages import when they run
+# (PyPDF2 is only imported for certificates the fast extractor cannot parse)
+SUBCOMMAND_IMPORTS = {
+    'ingest': [],
+    'autogate': ['openpyxl'],
+    'rego': [],
+    'export': ['openpyxl', 'stock_export'],
+}
+
+# Everything the scripts imported at module level before the imports were deferred
+EAGER_IMPORTS = ['openpyxl', 'stock_export', 'PyPDF2', 'selenium.webdriver']
+
+TIMER = """
+import importlib, time
+start = time.perf_counter()
+import clean_data
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass  # Optional dependency not installed here
+print(time.perf_counter() - start)
+"""
+
+
+def startup_time(modules):
+    """Return the seconds to import clean_data and the modules in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, '-c', TIMER.format(modules=modules)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output)
+
+
+def main(repeats=5):
+    # Interleave the configurations so drift in machine load affects them equally
+    configurations = {'eager': EAGER_IMPORTS, **SUBCOMMAND_IMPORTS}
+    times = {name: [] for name in configurations}
+    for _ in range(repeats):
+        for name, modules in configurations.items():
+            times[name].append(startup_time(modules))
+    medians = {name: statistics.median(values) for name, values in times.items()}
+
+    eager = medians.pop('eager')
+    print(f"Eager imports:  {eager * 1000:7.1f} ms")
+    for command, lazy in medians.items():
+        print(f"{command:<14}  {lazy * 1000:7.1f} ms  (saves {(eager - lazy) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    repeats_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    main(repeats_arg)
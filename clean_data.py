@@ -4,13 +4,33 @@
 Created on Tue Sep 24 16:45:54 2024
 
 @author: NAOJOH
+
+Each pipeline stage can be run on its own; openpyxl (Excel I/O) is only
+imported by the stages that read or write workbooks, and PyPDF2 only when a
+certificate needs the fallback extractor.
+
+Usage:
+    python clean_data.py [export]          Full run: clean, merge and save the result workbook
+    python clean_data.py ingest [csv]      Load the DMS stock export only
+    python clean_data.py autogate [csv]    Clean the Autogate export only
+    python clean_data.py rego [REGO ...]   Look up certificates (default: every plate in the DMS export)
 """
 
 import os
 import re
+import sys
 import pandas as pd
-import PyPDF2
-from datetime import datetime, timedelta
+from datetime import datetime
+from rego_certificate import extract_rego_info_from_bytes
+from stock_dates import CERT_DATE_FORMAT, STOCK_DATE_FORMAT, parse_date_column
+from stock_fingerprint import frame_fingerprint, input_fingerprint, output_is_current, result_is_current, save_fingerprints
+from rego_mirror import CertificateMirror, latest_certificates, scan_certificates
+from stage_scheduler import StageScheduler
+from stock_expiry import EXPIRY_ALERTS_FILE, write_expiry_alerts
+from stock_history import ingest_snapshot, partition_path
+from stock_keys import canonical_plates, canonical_vins, latest_per_vin, unique_keys
+from stock_schema import LISTING_METRIC_COLUMNS, apply_schema, memory_report
+from stock_status import status_text, stored_flags
 
 # ================================
 # Constants and Configuration
@@ -20,16 +40,38 @@ from datetime import datetime, timedelta
 DATE = datetime.now()
 
 # File paths
-AUTOGATE_EXCEL_FILE = f'raw_data/autogate_data_{DATE.strftime("%d%m%y")}.xlsx'
-USED_STOCK_DATA_FILE = f'raw_data/Stock{DATE.strftime("%d%m%y")}.dat'
+RAW_DATA_DIR = 'raw_data'
+AUTOGATE_FILE_FORMAT = 'autogate_data_%d%m%y.xlsx'
+STOCK_FILE_FORMAT = 'Stock%d%m%y.dat'
+AUTOGATE_EXCEL_FILE = f'{RAW_DATA_DIR}/{DATE.strftime(AUTOGATE_FILE_FORMAT)}'
+USED_STOCK_DATA_FILE = f'{RAW_DATA_DIR}/{DATE.strftime(STOCK_FILE_FORMAT)}'
 REGO_CERT_FOLDER = 'R:/UserData/St Peters RMS Work'
 
 RESULT_FILE = 'used_stock_data.xlsx'
 
+# Headers for Autogate Data
+AUTOGATE_HEADERS = [
+    'Make', 'Price', 'Odometer', 'Search Views', 'Detailed Views',
+    'Lead Count', 'Contact Watchers', 'Age', 'Health', 'Photos'
+]
+
+# Cell strings pandas reads as missing; treated as empty cells by the streaming reader
+NA_STRINGS = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+              '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+# Per-plate fields filled from the rego certificates
+REGO_COLUMNS = ['LAMS?', 'Rego Expiry', 'Rego Details']
+
 # Regular Expressions
-DATE_PATTERN = r"\d{2}-\d{2}-\d{4}"
 PROCYCLES_NAME = 'PROCYCLES (HORNSBY) PTY LTD'
 
+def set_run_date(date):
+    """Point the stages at another day's exports; long-running callers use it when the day rolls over."""
+    global DATE, AUTOGATE_EXCEL_FILE, USED_STOCK_DATA_FILE
+    DATE = date
+    AUTOGATE_EXCEL_FILE = f'{RAW_DATA_DIR}/{DATE.strftime(AUTOGATE_FILE_FORMAT)}'
+    USED_STOCK_DATA_FILE = f'{RAW_DATA_DIR}/{DATE.strftime(STOCK_FILE_FORMAT)}'
+
 # ================================
 # Extraction Functions
 # ================================
@@ -61,125 +103,107 @@ def extract_price(price_str):
             return pd.NA
     return pd.NA
 
-def extract_rego_info(pdf_path):
-    """
-    Extracts registration details from a PDF file.
-
-    Returns:
-        dict: {
-            "rego_name": str or None,
-            "is_lam": bool,
-            "expiry_date": str or None
-        }
-    """
-    try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = reader.pages[0].extract_text()
-            lines = text.split('\n')
-            
-            # Extract Rego Name
-            plate_number = lines[3].split()[0]
-            rego_name = lines[7][len(plate_number):].strip()
-            
-            # Determine if "LA." condition exists
-            is_lam = any(line.startswith("LA.") for line in lines[15:17])
-            
-            # Find the expiry date in lines 10-13
-            expiry_date = next(
-                (re.search(DATE_PATTERN, lines[i]).group(0) 
-                 for i in range(10, 14) if re.search(DATE_PATTERN, lines[i])),
-                None
-            )
-            
-            if not expiry_date:
-                raise ValueError("Expiry date not found in lines 10-13")
-            
-            return {
-                "rego_name": rego_name,
-                "is_lam": is_lam,
-                "expiry_date": expiry_date
-            }
-    except Exception:
-        return {
-            "rego_name": None,
-            "is_lam": False,
-            "expiry_date": None
-        }
-
 # ================================
 # Autogate Data Cleaning
 # ================================
 
-def clean_autogate_data():
-    """Cleans the Autogate data and returns a cleaned DataFrame."""
-    
-    # Headers for Autogate Data
-    AUTOGATE_HEADERS = [
-        'Make', 'Price', 'Odometer', 'Search Views', 'Detailed Views',
-        'Lead Count', 'Contact Watchers', 'Age', 'Health', 'Photos'
-    ]
-    # Read Excel file with headers
-    data = pd.read_excel(AUTOGATE_EXCEL_FILE, header=None, names=AUTOGATE_HEADERS)
-    
-    # Initialize lists to store cleaned data
-    cleaned_data = []
+def iter_autogate_rows(file_path):
+    """Yield the cell values of each row of the Autogate export, streamed in read-only mode."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for values in sheet.iter_rows(values_only=True):
+            # Pad or trim to the Autogate columns, blanking the strings pandas reads as missing
+            values = (tuple(values) + (None,) * len(AUTOGATE_HEADERS))[:len(AUTOGATE_HEADERS)]
+            yield tuple(None if isinstance(v, str) and v in NA_STRINGS else v for v in values)
+    finally:
+        workbook.close()
+
+def group_autogate_rows(rows):
+    """Yield one record per listing from the export's valid and continuation rows.
+
+    A valid row has a value outside the first column; the continuation rows that
+    follow it only fill the first column, and the first of them containing '|'
+    becomes the listing's Details.
+    """
     current_row = None
-    invalid_rows = []
-    
-    # Process each row to associate invalid rows with the current valid row
-    for _, row in data.iterrows():
-        # A valid row has at least one non-NA value excluding the first column
-        if row.iloc[1:].notna().any():
-            if current_row:
-                # Process invalid rows associated with the previous valid row
-                if invalid_rows:
-                    details = [str(r.iloc[0]) for r in invalid_rows if '|' in str(r.iloc[0])]
-                    if details:
-                        first_detail = details[0]
-                        current_row['Details'] = first_detail
-            if current_row:
-                cleaned_data.append(current_row)
-            
+    details = ''
+    for values in rows:
+        if any(v is not None for v in values[1:]):
+            if current_row is not None:
+                current_row['Details'] = details
+                yield current_row
             # Start a new valid row
-            current_row = row.to_dict()
-            current_row['Details'] = ''
-            invalid_rows = []
-        else:
-            # Collect invalid rows
-            invalid_rows.append(row)
-    
-    # Append the last valid row after the loop
-    if current_row:
-        if invalid_rows:
-            details = [str(r.iloc[0]) for r in invalid_rows if '|' in str(r.iloc[0])]
-            if details:
-                first_detail = details[0]
-                current_row['Details'] = first_detail
-        cleaned_data.append(current_row)
-    
-    # Convert cleaned_data to DataFrame
-    cleaned_df = pd.DataFrame(cleaned_data)
+            current_row = dict(zip(AUTOGATE_HEADERS, values))
+            details = ''
+        elif not details and '|' in str(values[0]):
+            details = str(values[0])
+
+    # Emit the last valid row
+    if current_row is not None:
+        current_row['Details'] = details
+        yield current_row
+
+def clean_autogate_data():
+    """Cleans the Autogate data and returns a cleaned DataFrame."""
+    # Group rows as they are streamed from the workbook
+    cleaned_df = pd.DataFrame(group_autogate_rows(iter_autogate_rows(AUTOGATE_EXCEL_FILE)))
     
     # Apply extraction functions
-    cleaned_df['VIN'] = cleaned_df['Details'].apply(extract_vin)
+    cleaned_df['VIN'] = canonical_vins(cleaned_df['Details'].apply(extract_vin))
     cleaned_df['Parsed Age (Days)'] = cleaned_df['Age'].apply(extract_days)
-    cleaned_df['Date Listed'] = cleaned_df['Parsed Age (Days)'].apply(
-        lambda x: (DATE - timedelta(days=x)).date() if pd.notna(x) else pd.NA
-    )
+    cleaned_df['Date Listed'] = pd.Timestamp(DATE.date()) - pd.to_timedelta(cleaned_df['Parsed Age (Days)'], unit='D')
     cleaned_df['Listed Price'] = cleaned_df['Price'].apply(extract_price)
     
-    # Select relevant columns
-    final_df = cleaned_df[['VIN', 'Date Listed', 'Listed Price']]
+    # Listing performance metrics as numbers; unreadable cells become missing
+    for col in LISTING_METRIC_COLUMNS:
+        cleaned_df[col] = pd.to_numeric(cleaned_df[col], errors='coerce')
+    
+    # Select relevant columns, keeping the latest listing of each VIN so the merge cannot duplicate stock
+    final_df = latest_per_vin(cleaned_df[['VIN', 'Date Listed', 'Listed Price'] + LISTING_METRIC_COLUMNS], 'Date Listed')
     
     return final_df
 
+# ================================
+# Rego Certificate Lookups
+# ================================
+
+def lookup_regos(regos, catalogue):
+    """Return {rego: (LAMS?, Rego Expiry, Rego Details)} from each plate's latest certificate."""
+    certificates = latest_certificates(catalogue, regos)
+
+    # Copy the matched certificates to the local mirror in the background
+    with CertificateMirror() as mirror:
+        mirror.prefetch(entry for entry in certificates.values() if entry)
+
+        rego_fields = {}
+        for rego, entry in certificates.items():
+            if entry:
+                # Extract rego information
+                info = extract_rego_info_from_bytes(mirror.read(entry))
+                lams = 'Yes' if info['is_lam'] else 'No'
+                expiry = info['expiry_date'] if info['expiry_date'] else ''
+                
+                # Update 'Rego Details' based on rego name
+                if info['rego_name'] == PROCYCLES_NAME:
+                    details = pd.NA  # Rego is valid under Procycles; no additional message needed
+                elif info['rego_name']:
+                    details = 'Rego not under Procycles'
+                else:
+                    details = 'No rego found'
+                rego_fields[rego] = (lams, expiry, details)
+            else:
+                # No matching files for the rego
+                rego_fields[rego] = (pd.NA, pd.NA, 'No rego found')
+    return rego_fields
+
 # ================================
 # Used Stock Data Cleaning
 # ================================
 
-def clean_used_stock_data(autogate_df):
-    """Cleans the Used Stock data and merges with Autogate data."""
+def load_used_stock_data():
+    """Loads the DMS stock export, keeping vehicles for sale, sorted newest first."""
     # Load and preprocess data
     df = pd.read_csv(USED_STOCK_DATA_FILE, delimiter=',')
     
@@ -191,86 +215,86 @@ def clean_used_stock_data(autogate_df):
     df['Stock Type'] = df['Stock Type'].replace('Consignment Stock', 'Consignment')
     
     # Initialize new columns
-    df[['LAMS?', 'Rego Expiry', 'Rego Details']] = pd.NA
+    df[REGO_COLUMNS] = pd.NA
     
     # Convert and sort dates
-    df['Date Into Stock'] = pd.to_datetime(df['Date Into Stock'], format='%d/%m/%y', errors='coerce')
+    df['Date Into Stock'] = parse_date_column(df['Date Into Stock'], [STOCK_DATE_FORMAT])
     df.sort_values(by='Date Into Stock', ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
     
-    # Update 'Rego Number' where length > 5 to empty string
-    df.loc[df['Rego Number'].str.len() > 5, 'Rego Number'] = ''
+    # Canonical lookup keys; placeholder and over-long plates become empty strings
+    df['VIN'] = canonical_vins(df['VIN'])
+    df['Rego Number'] = canonical_plates(df['Rego Number'])
     
-    # Filter valid rego numbers (non-empty)
-    valid_regos = df.loc[df['Rego Number'].notna() & (df['Rego Number'] != ''), 'Rego Number'].unique()
+    return df
+
+def clean_used_stock_data(autogate_df, stock_df=None, catalogue=None, inputs=None):
+    """Cleans the Used Stock data and merges with Autogate data.
+
+    stock_df is the loaded DMS export and catalogue the certificate folder
+    listing (both loaded here if not given); inputs is the run's input
+    fingerprint, recorded once the result is saved.
+    """
+    from stock_export import write_stock_workbook
     
-    # Map rego numbers to their files
-    file_list = os.listdir(REGO_CERT_FOLDER)
-    file_map = {rego: [] for rego in valid_regos}
+    df = load_used_stock_data() if stock_df is None else stock_df
     
-    for file in file_list:
-        for rego in valid_regos:
-            if rego in file:
-                file_map[rego].append(file)
+    # Each distinct plate is looked up once, however many stock records share it
+    valid_regos = unique_keys(df['Rego Number'])
+    print(f"Certificate lookups: {len(valid_regos)} plates for {len(df)} vehicles")
     
-    # Process each rego
-    for rego, files in file_map.items():
-        if files:
-            # Select the latest file based on modification time
-            latest_file = max(files, key=lambda f: os.path.getmtime(os.path.join(REGO_CERT_FOLDER, f)))
-            latest_file_path = os.path.join(REGO_CERT_FOLDER, latest_file)
-            
-            # Extract rego information
-            info = extract_rego_info(latest_file_path)
-            df.loc[df['Rego Number'] == rego, 'LAMS?'] = 'Yes' if info['is_lam'] else 'No'
-            df.loc[df['Rego Number'] == rego, 'Rego Expiry'] = info['expiry_date'] if info['expiry_date'] else ''
-            
-            # Update 'Rego Details' based on rego name
-            if info['rego_name'] == PROCYCLES_NAME:
-                pass  # Rego is valid under Procycles; no additional message needed
-            elif info['rego_name']:
-                df.loc[df['Rego Number'] == rego, 'Rego Details'] = 'Rego not under Procycles'
-            else:
-                df.loc[df['Rego Number'] == rego, 'Rego Details'] = 'No rego found'
-
-        else:
-            # No matching files for the rego
-            df.loc[df['Rego Number'] == rego, 'Rego Details'] = 'No rego found'
+    # Catalogue the certificate share once and match each rego to its latest certificate
+    if catalogue is None:
+        catalogue = scan_certificates(REGO_CERT_FOLDER)
+    rego_fields = lookup_regos(valid_regos, catalogue)
     
-    # Read and process Autogate data
-    df_autogate = autogate_df.copy()
+    # Fan the per-plate results back out to every record with that plate
+    rego_lookup = pd.DataFrame.from_dict(rego_fields, orient='index', columns=REGO_COLUMNS)
+    df[REGO_COLUMNS] = rego_lookup.reindex(df['Rego Number']).to_numpy()
     
-    # Ensure 'Date Listed' is in datetime format for merging
-    df_autogate['Date Listed'] = pd.to_datetime(df_autogate['Date Listed'], errors='coerce')
+    # Certificate expiry dates are kept as datetimes from here on
+    df['Rego Expiry'] = parse_date_column(df['Rego Expiry'], [CERT_DATE_FORMAT])
+    
+    # Read and process Autogate data ('Date Listed' is already a datetime)
+    df_autogate = autogate_df.copy()
     
     # Merge 'Date Listed' and 'Listed Price' into main dataframe based on 'VIN'
     df = df.merge(df_autogate, on='VIN', how='left')
     
-    # Create 'Status' column
-    df['Status'] = ''
-    # Add 'Transfer rego' if there is any value in 'Rego Details'
-    df.loc[df['Rego Details'].notna() & (df['Rego Details'] != ''), 'Status'] += 'Transfer rego'
-    # Add 'Create listing' if 'Date Listed' is empty
-    df.loc[df['Date Listed'].isna() | (df['Date Listed'] == ''), 'Status'] += '; Create listing'
-    # Clean up 'Status' column by removing leading/trailing semicolons and spaces
-    df['Status'] = df['Status'].str.replace('^; ', '', regex=True).str.replace('; $', '', regex=True).str.strip('; ')
+    # Create 'Status' column ('Transfer rego', 'Create listing') from the status rules
+    df['Status'] = status_text(stored_flags(df))
     
     # Select and format columns
     df = df[[
         'Stock Number', 'Date Into Stock', 'Make', 'Model', 
         'LAMS?', 'VIN', 'Rego Number', 'Rego Expiry', 'Rego Details', 
         'Date Listed', 'Listed Price', 'Status'
-    ]]
+    ] + LISTING_METRIC_COLUMNS]
+    
+    # Switch to the compact stock dtypes
+    compact_df = apply_schema(df)
+    total = memory_report(df, compact_df).loc['Total']
+    print(f"Stock frame memory: {total['Before (KB)']:.1f} KB -> {total['After (KB)']:.1f} KB")
+    df = compact_df
     
-    # Format date columns
-    df['Date Into Stock'] = df['Date Into Stock'].dt.strftime('%d-%b-%Y')
-    df['Rego Expiry'] = pd.to_datetime(df['Rego Expiry'], errors='coerce', dayfirst=True).dt.strftime('%d-%b-%Y').fillna('')
-    df['Date Listed'] = df['Date Listed'].dt.strftime('%d-%b-%Y').fillna('')
+    # Save to Excel with date and currency formats, unless the result is unchanged
+    output = frame_fingerprint(df)
+    changed = not output_is_current(RESULT_FILE, output)
+    if changed:
+        write_stock_workbook(df, RESULT_FILE)
+        print(f"Used stock data cleaned and saved to {RESULT_FILE}")
+    else:
+        print(f"Used stock data unchanged; {RESULT_FILE} not rewritten")
     
-    # Save to Excel
-    df.to_excel(RESULT_FILE, index=False)
+    # Record the day's snapshot in the stock history
+    if changed or not os.path.exists(partition_path(DATE.date())):
+        ingest_snapshot(df, DATE)
     
-    print(f"Used stock data cleaned and saved to {RESULT_FILE}")
+    # Rego expiry alerts depend on the day as well as the stock, so they are written every run
+    write_expiry_alerts(df, EXPIRY_ALERTS_FILE, DATE)
+    
+    if inputs is not None:
+        save_fingerprints(RESULT_FILE, inputs, output)
 
 # ================================
 # Main Execution
@@ -278,11 +302,68 @@ def clean_used_stock_data(autogate_df):
 
 def main():
     """Main function to execute data cleaning and processing."""
-    # Step 1: Clean Autogate Data
-    autogate_cleaned_df = clean_autogate_data()
+    # Step 1: Read the Autogate export, the DMS export and the certificate folder concurrently
+    stages = StageScheduler()
+    stages.add('certificates', scan_certificates, REGO_CERT_FOLDER)
+    stages.add('autogate', clean_autogate_data)
+    stages.add('stock', load_used_stock_data)
+    stages.start()
+    
+    # Step 2: Skip the run if none of its inputs changed since the last one
+    catalogue = stages.result('certificates')
+    inputs = input_fingerprint([AUTOGATE_EXCEL_FILE, USED_STOCK_DATA_FILE], catalogue, DATE.date())
+    if result_is_current(RESULT_FILE, inputs):
+        print(f"Inputs unchanged since the last run; {RESULT_FILE} is up to date")
+        return
     
-    # Step 2: Clean Used Stock Data and Merge with Autogate Data
-    clean_used_stock_data(autogate_cleaned_df)
+    # Step 3: Clean Used Stock Data and Merge with Autogate Data
+    autogate_cleaned_df = stages.result('autogate')
+    stock_df = stages.result('stock')
+    print(stages.report())
+    clean_used_stock_data(autogate_cleaned_df, stock_df=stock_df, catalogue=catalogue, inputs=inputs)
+
+# ================================
+# Single Stages
+# ================================
+
+def run_ingest(output_file=None):
+    """Load the DMS stock export on its own, optionally saving it as CSV."""
+    df = load_used_stock_data()
+    print(f"DMS export: {len(df)} vehicles for sale in {USED_STOCK_DATA_FILE}")
+    if output_file:
+        df.to_csv(output_file, index=False)
+        print(f"Stock data saved to {output_file}")
+
+def run_autogate(output_file=None):
+    """Clean the Autogate export on its own, optionally saving it as CSV."""
+    df = clean_autogate_data()
+    print(f"Autogate export: {len(df)} listings in {AUTOGATE_EXCEL_FILE}")
+    if output_file:
+        df.to_csv(output_file, index=False)
+        print(f"Listings saved to {output_file}")
+
+def run_rego(*regos):
+    """Look up the given plates' certificates, or every plate in the DMS export."""
+    if regos:
+        regos = unique_keys(canonical_plates(pd.Series(regos)))
+    else:
+        regos = unique_keys(load_used_stock_data()['Rego Number'])
+    rego_fields = lookup_regos(regos, scan_certificates(REGO_CERT_FOLDER))
+    rego_lookup = pd.DataFrame.from_dict(rego_fields, orient='index', columns=REGO_COLUMNS)
+    print(rego_lookup.fillna('').to_string() if len(rego_lookup) else "No plates to look up")
+
+# Subcommands with the most arguments each accepts (None for any number)
+SUBCOMMANDS = {
+    'export': (main, 0),
+    'ingest': (run_ingest, 1),
+    'autogate': (run_autogate, 1),
+    'rego': (run_rego, None),
+}
 
 if __name__ == "__main__":
-    main()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    args = sys.argv[2:]
+    if command not in SUBCOMMANDS or (SUBCOMMANDS[command][1] is not None and len(args) > SUBCOMMANDS[command][1]):
+        print(__doc__)
+        sys.exit(1)
+    SUBCOMMANDS[command][0](*args)
@@ -2,6 +2,7 @@
 
 #cd C:\Users\naojoh\Desktop\projects_v3\project_beta_v2
 #python -m streamlit run dashboard.py
+#python dashboard_startup.py  (warms up the snapshot before the first session)
 # http://192.168.42.182:8501
 
 """
@@ -13,11 +14,54 @@ Author: NAOJOH
 import streamlit as st
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+from time import perf_counter
 from streamlit_pills import pills
+from dashboard_diagnostics import RerunDiagnostics
+from dashboard_startup import REPORT as STARTUP_REPORT
+from stock_expiry import ExpiryIndex
+from stock_snapshot import file_signature, shared_provider
+from stock_history import AGE_BUCKETS, AGGREGATES_DIR, AGGREGATE_TABLES, load_aggregates
+from stock_query import filter_positions
+from stock_sql import snapshot_loader
+from stock_status import (ADD_PRICE, AGED_STOCK, CREATE_LISTING, EXPIRES_SOON, FLAGS_COLUMN,
+                          REGO_EXPIRED, TRANSFER_REGO, dated_flags)
 
 DATE = datetime.now()
 
+# Start of this script run, for the session's time to first render
+RUN_STARTED = perf_counter()
+
+# Rows rendered per table page ("All" renders the full view)
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250, "All"]
+DEFAULT_PAGE_SIZE = 50
+
+# Columns shown in the table, in display order
+DISPLAY_COLUMNS = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'VIN',
+                   'Rego Number', 'Rego Expiry', 'Listed Price', 'Date Listed', 'Status']
+
+# Source columns a rendered table row depends on, besides its status flags
+ROW_SOURCE_COLUMNS = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'LAMS?', 'VIN',
+                      'Rego Number', 'Rego Expiry', 'Listed Price_num', 'Date Listed']
+
+# Status badges shown for each status flag, in display order
+STATUS_BADGES = [
+    (TRANSFER_REGO, '❓ Transfer rego'),
+    (CREATE_LISTING, '❗ Create listing'),
+    (ADD_PRICE, '💲 Add price'),
+    (AGED_STOCK, '⏳ Aged stock'),
+]
+
+# Maximum number of rendered rows kept in the HTML fragment cache
+ROW_CACHE_SIZE = 4096
+
+# Days ahead shown in the expiry calendar
+EXPIRY_CALENDAR_DAYS = 90
+
+# Columns shown for the vehicles in an expiry window
+EXPIRY_COLUMNS = ['Stock Number', 'Make', 'Model', 'Rego Number', 'Rego Expiry']
+
 # ============================
 # Set Page Configuration
 # ============================
@@ -167,27 +211,14 @@ def add_custom_css():
 # Function Definitions
 # ============================
 
-@st.cache_data
-def load_data(file_path):
-    """Load data from the specified Excel file and fill NaN values."""
-    return pd.read_excel(file_path).fillna('')
-
-def preprocess_data(df):
-    """Preprocess the DataFrame by converting columns and checking for required columns."""
-    required_columns = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'VIN', 'LAMS?',
-                        'Rego Number', 'Rego Expiry', 'Listed Price', 'Date Listed', 'Status']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        st.error(f"⚠️ Missing columns in the dataset: {', '.join(missing_columns)}")
-        st.stop()
-    else:
-        # Convert date columns
-        date_columns = ['Date Into Stock', 'Rego Expiry', 'Date Listed']
-        for col in date_columns:
-            df[col + '_dt'] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
-        # Convert price to numeric
-        df['Listed Price_num'] = pd.to_numeric(df['Listed Price'], errors='coerce')
-        return df
+def get_data_provider(file_path):
+    """Return the process-wide provider that reloads the file in the background when it changes.
+
+    The provider may already have been warmed up by dashboard_startup before the
+    first session. The snapshot data is shared by all sessions and must be
+    treated as read-only.
+    """
+    return shared_provider(file_path, snapshot_loader())
 
 def create_inactive_make_button(make):
     """Create smaller inactive buttons for the 'Make' column."""
@@ -206,161 +237,192 @@ def create_lams_button(lams_value):
     else:
         return ''
 
-def create_status_buttons(status):
-    """Create a composite status button combining Status values."""
-    buttons = []
-    # Rego Status Button
-    if 'transfer rego' in status.lower():
-        buttons.append(
-            '<span class="status-button" style="background-color:#A9A9A9; margin-right: 4px;">❓ Transfer rego</span>'
-        )
-    # Create Listing Button
-    if 'create listing' in status.lower():
-        buttons.append(
-            '<span class="status-button" style="background-color:#A9A9A9; margin-right: 4px;">❗ Create listing</span>'
-        )
+def create_status_buttons(flags):
+    """Create a composite status button from a vehicle's status flags."""
+    buttons = [
+        f'<span class="status-button" style="background-color:#A9A9A9; margin-right: 4px;">{label}</span>'
+        for flag, label in STATUS_BADGES if flags & flag
+    ]
     # Combine all buttons into a single string separated by spaces
-    return ' '.join(buttons) if buttons else ''
+    return ' '.join(buttons)
 
-def create_rego_expiry_button(expiry_date):
-    """Create an inactive button indicating 'Expired' or 'Expires soon' based on the expiry date."""
-    # Convert the expiry date to a datetime object
-    expiry_datetime = pd.to_datetime(expiry_date, errors='coerce', dayfirst=True)
-
-    # Determine status
-    if expiry_datetime < DATE:
+def create_rego_expiry_button(flags):
+    """Create an inactive button indicating 'Expired' or 'Expires soon' from a vehicle's status flags."""
+    if flags & REGO_EXPIRED:
         return '<span class="status-button" style="background-color:#FF6347; margin-left: 4px;">Expired</span>'
-    elif expiry_datetime < DATE + timedelta(days=30):
+    elif flags & EXPIRES_SOON:
         return '<span class="status-button" style="background-color:#FFA500; margin-left: 4px;">Expires soon</span>'
     else:
-        return ''  # No button if status is 'Valid' or 'Unknown'
+        return ''  # No button if the rego is valid or its expiry unknown
     
 
-def filter_data(df, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number, sort_by, sort_order):
-    """Apply filters, search, and sorting to the DataFrame and return a copy."""
-    df_filtered = df.copy()
-    
+def render_row_html(row):
+    """Render one table row to HTML; its flags include the day's expiry and age rules."""
+    (stock_number, date_into_stock, make, model, lams, vin,
+     rego_number, rego_expiry, listed_price, date_listed, flags) = row
+    cells = [
+        stock_number,
+        date_into_stock,
+        create_inactive_make_button(str(make)),
+        f"{model} {create_lams_button(str(lams))}",
+        vin,
+        rego_number,
+        f"{rego_expiry} {create_rego_expiry_button(flags)}",
+        f"${listed_price:,.2f}" if listed_price is not None else "",
+        date_listed,
+        create_status_buttons(flags),
+    ]
+    return '<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>'
+
+@st.cache_resource
+def get_row_renderer():
+    """Return a process-wide LRU-cached row renderer keyed by row content and flags.
+
+    Streamlit re-executes this script on every rerun, so the cache is held as a
+    resource to survive reruns and be shared across sessions.
+    """
+    return lru_cache(maxsize=ROW_CACHE_SIZE)(render_row_html)
+
+def display_dataframe(df_filtered):
+    """Convert the DataFrame to HTML, display it with custom styling and return the HTML size in bytes."""
     # ----------------------------
-    # Apply Filtering
+    # Build the header once per render
     # ----------------------------
-    
-    # Filter by Make
-    if selected_make != "ALL":
-        if selected_make == "OTHER":
-            df_filtered = df_filtered[~df_filtered['Make'].str.contains('BMW|KAW|KTM', case=False, na=False)].copy()
-        else:
-            df_filtered = df_filtered[df_filtered['Make'].str.contains(selected_make, case=False, na=False)].copy()
-    
-    # Filter by LAMS Approved
-    if lams_only:
-        df_filtered = df_filtered[df_filtered['LAMS?'].str.strip().str.lower() == 'yes'].copy()
-    
-    # Filter for Create Listing Only
-    if create_listing_only:
-        df_filtered = df_filtered[df_filtered['Status'].str.contains('Create listing', case=False, na=False)].copy()
-    
-    # Filter for Transfer Rego Only
-    if transfer_rego_only:
-        df_filtered = df_filtered[df_filtered['Status'].str.contains('Transfer rego', case=False, na=False)].copy()
+    header = '<tr style="text-align: right;">' + ''.join(f'<th>{col}</th>' for col in DISPLAY_COLUMNS) + '</tr>'
     
     # ----------------------------
-    # Apply Search
+    # Concatenate cached row fragments; only changed rows are rendered
     # ----------------------------
+    render_row = get_row_renderer()
+    # Add today's expiry and age flags for the visible rows only
+    flags = df_filtered[FLAGS_COLUMN].to_numpy() | dated_flags(df_filtered)
+    rows = []
+    for row, row_flags in zip(df_filtered[ROW_SOURCE_COLUMNS].itertuples(index=False, name=None), flags.tolist()):
+        # Missing prices are NaN, which never compares equal, so key them as None
+        listed_price = row[8] if pd.notnull(row[8]) else None
+        rows.append(render_row(row[:8] + (listed_price,) + row[9:] + (row_flags,)))
     
-    if stock_number:
-        df_filtered = df_filtered[
-            df_filtered['Stock Number'].astype(str).str.contains(stock_number, case=False, na=False)
-        ].copy()
-    
-    if rego_number:
-        df_filtered = df_filtered[
-            df_filtered['Rego Number'].astype(str).str.contains(rego_number, case=False, na=False)
-        ].copy()
+    html_table = (
+        '<table border="1" class="dataframe">'
+        f'<thead>{header}</thead>'
+        f'<tbody>{"".join(rows)}</tbody>'
+        '</table>'
+    )
     
     # ----------------------------
-    # Apply Sorting
+    # Render the table inside a scrollable div
     # ----------------------------
-    
-    if sort_by:
-        sort_col = sort_by
-        # Use datetime and numeric columns for sorting if applicable
-        if sort_by == 'Date Into Stock':
-            sort_col = 'Date Into Stock_dt'
-        elif sort_by == 'Rego Expiry':
-            sort_col = 'Rego Expiry_dt'
-        elif sort_by == 'Date Listed':
-            sort_col = 'Date Listed_dt'
-        
-        ascending = True if sort_order == "Oldest first" else False
-        df_filtered = df_filtered.sort_values(by=sort_col, ascending=ascending)
-    
-    return df_filtered
+    markup = f'<div class="scrollable-table">{html_table}</div>'
+    st.markdown(markup, unsafe_allow_html=True)
+    return len(markup.encode('utf-8'))
 
-def display_dataframe(df_filtered):
-    """Convert the DataFrame to HTML and display it with custom styling."""
-    # Reset index to ensure unique indices
-    df_filtered = df_filtered.reset_index(drop=True)
 
-    # ----------------------------
-    # Format 'Listed Price' as currency
-    # ----------------------------
-    df_filtered['Listed Price'] = df_filtered['Listed Price_num'].apply(
-        lambda x: f"${x:,.2f}" if pd.notnull(x) else ""
-    )
+def history_signature():
+    """Return the file signatures of the history aggregate tables, for cache invalidation."""
+    return tuple(file_signature(os.path.join(AGGREGATES_DIR, name)) for name in AGGREGATE_TABLES.values())
+
+@st.cache_data
+def load_history_aggregates(signature):
+    """Load the precomputed history aggregates; reloaded whenever their files change."""
+    return load_aggregates()
+
+def display_trends(aggregates):
+    """Render stock history trend charts from the precomputed daily aggregates."""
+    listing = aggregates['listing']
+    if listing.empty:
+        st.info("No stock history recorded yet. Run clean_data.py to record today's snapshot.")
+        return
+    listing = listing.set_index('Snapshot Date')
+    latest = listing.iloc[-1]
     
     # ----------------------------
-    # Apply the inactive button for the 'Make' column
+    # Latest snapshot summary
     # ----------------------------
-    df_filtered['Make'] = df_filtered['Make'].fillna('').astype(str).apply(create_inactive_make_button)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("In Stock", int(latest['In Stock']))
+    col2.metric("Unlisted", int(latest['Unlisted']))
+    col3.metric("Median Days To List", f"{latest['Median Days To List']:.0f}" if pd.notnull(latest['Median Days To List']) else "–")
     
     # ----------------------------
-    # Integrate 'LAMS?' into 'Model' column using vectorized operations
+    # Stock by make over time
     # ----------------------------
-    df_filtered['Model'] = df_filtered['Model'].fillna('').astype(str) + ' ' + df_filtered['LAMS?'].fillna('').astype(str).apply(create_lams_button)
-    
+    st.subheader("Stock by Make")
+    st.line_chart(aggregates['makes'].pivot(index='Snapshot Date', columns='Make', values='Count').fillna(0))
     
     # ----------------------------
-    # Process 'Rego Expiry' column: keep date as text and add status button
+    # Days-in-stock distribution over time
     # ----------------------------
-    df_filtered['Rego Expiry'] = df_filtered['Rego Expiry'].fillna('').astype(str).apply(
-        lambda x: f"{x} {create_rego_expiry_button(x)}"
-    )
+    st.subheader("Days in Stock")
+    aging = aggregates['aging'].pivot(index='Snapshot Date', columns='Bucket', values='Count')
+    st.bar_chart(aging[[label for _, label in AGE_BUCKETS if label in aging.columns]])
     
     # ----------------------------
-    # Create 'Status' column by combining 'Rego Status', 'Rego Number', and 'Date Listed'
+    # Time to listing over time
     # ----------------------------
-    df_filtered['Status'] = df_filtered['Status'].fillna('').astype(str).apply(create_status_buttons)
+    st.subheader("Time to Listing")
+    st.line_chart(listing[['Median Days To List', 'Median Days In Stock']])
     
     # ----------------------------
-    # Define columns to display
+    # Listing performance in the latest snapshot, least viewed first
     # ----------------------------
-    columns_to_display = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'VIN',
-                          'Rego Number', 'Rego Expiry', 'Listed Price', 'Date Listed', 'Status']
-    df_filtered = df_filtered[columns_to_display]
+    performance = aggregates['performance']
+    if not performance.empty:
+        st.subheader("Listing Performance")
+        performance = performance[performance['Snapshot Date'] == performance['Snapshot Date'].max()]
+        st.dataframe(
+            performance.sort_values('Detailed Views Per Day')[[
+                'Make', 'Bucket', 'Listings', 'Search Views Per Day', 'Detailed Views Per Day', 'Leads Per 1k Views'
+            ]].rename(columns={'Bucket': 'Days Listed'}),
+            hide_index=True,
+            column_config={
+                'Search Views Per Day': st.column_config.NumberColumn(format="%.1f"),
+                'Detailed Views Per Day': st.column_config.NumberColumn(format="%.2f"),
+                'Leads Per 1k Views': st.column_config.NumberColumn(format="%.1f"),
+            },
+        )
+
+@st.cache_resource(max_entries=2)
+def get_expiry_index(path, signature, _df_all, _sort_index):
+    """Return the snapshot's sorted expiry index, built once per loaded file and shared by all sessions."""
+    return ExpiryIndex.from_sort_index(_df_all, _sort_index)
+
+def display_expiry(expiry_index, df_all):
+    """Render the rego expiry alert windows, the weekly expiry calendar and one window's vehicles."""
+    today = pd.Timestamp(DATE.date())
+    windows = expiry_index.alert_windows(today)
     
     # ----------------------------
-    # Drop unnecessary columns
+    # Vehicles per alert window
     # ----------------------------
-    columns_to_drop = ['Date Into Stock_dt', 'Rego Expiry_dt', 'Date Listed_dt', 'Listed Price_num', 'LAMS?']
-    df_filtered = df_filtered.drop(columns=columns_to_drop, errors='ignore')
+    for column, (label, positions, _) in zip(st.columns(len(windows)), windows):
+        column.metric(label, len(positions))
     
     # ----------------------------
-    # Convert the DataFrame to HTML for rendering buttons, hiding the index
+    # Expiries per week ahead
     # ----------------------------
-    html_table = df_filtered.to_html(escape=False, index=False)
+    st.subheader("Expiry Calendar")
+    upcoming = expiry_index.calendar_between(today + pd.Timedelta(days=1), today + pd.Timedelta(days=EXPIRY_CALENDAR_DAYS))
+    if upcoming.empty:
+        st.info(f"No regos expire in the next {EXPIRY_CALENDAR_DAYS} days.")
+    else:
+        st.bar_chart(upcoming.resample('W-MON', label='left', closed='left').sum().rename_axis('Week'))
     
     # ----------------------------
-    # Render the table inside a scrollable div
+    # Vehicles in the chosen window, soonest first
     # ----------------------------
-    st.markdown(f'<div class="scrollable-table">{html_table}</div>', unsafe_allow_html=True)
-
-
+    labels = [label for label, _, _ in windows]
+    label = st.selectbox("Expiry window", labels, index=1)
+    positions = windows[labels.index(label)][1]
+    st.dataframe(df_all.iloc[positions][EXPIRY_COLUMNS], hide_index=True)
 
 # ============================
 # Main Application
 # ============================
 
 def main():
+    # Opt-in timings and profile for this rerun (?diagnostics=1)
+    diagnostics = RerunDiagnostics.from_request()
+
     # Add custom CSS
     add_custom_css()
 
@@ -369,21 +431,23 @@ def main():
     # ============================
     RESULT_FILE = 'used_stock_data.xlsx'
 
-    if os.path.exists(RESULT_FILE):
-        try:
-            df_all = load_data(RESULT_FILE)
-        except Exception as e:
-            st.error(f"⚠️ Error reading the Excel file: {e}")
-            st.stop()
-    else:
-        st.error(f"⚠️ File {RESULT_FILE} does not exist.")
+    # The first load blocks; later files are picked up by the background provider
+    provider = get_data_provider(RESULT_FILE)
+    wait_started = perf_counter()
+    with diagnostics.phase("Load snapshot"):
+        snapshot = provider.get()
+    snapshot_wait = perf_counter() - wait_started
+    if snapshot is None:
+        if provider.error is not None:
+            st.error(f"⚠️ Error reading the Excel file: {provider.error}")
+        else:
+            st.error(f"⚠️ File {RESULT_FILE} does not exist.")
         st.stop()
-    
-    # Preprocess Data
-    df_all = preprocess_data(df_all)
+    df_all, sort_index = snapshot.data[:2]
+    database = snapshot.data[2] if len(snapshot.data) > 2 else None
 
     st.title("🏍️ Used Stock Dashboard")
-    st.markdown(f"Last Updated: {DATE.strftime('%d-%m-%Y')}")
+    st.markdown(f"Last Updated: {snapshot.modified.strftime('%d-%m-%Y %H:%M')}")
 
     # ============================
     # Sidebar for Additional Filters
@@ -433,27 +497,72 @@ def main():
         
         # Search by Rego Number
         rego_number = st.text_input("Search by Rego Number", placeholder="ABC12")
+        
+        st.markdown("---")
+        
+        # ============================
+        # Display Section
+        # ============================
+        st.header("📄 Display")
+        
+        # Rows per page
+        page_size = st.selectbox(
+            "Rows per page", PAGE_SIZE_OPTIONS,
+            index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE)
+        )
     
     # ============================
     # Apply Filters, Sorting, and Search
     # ============================
-    df_filtered = filter_data(
-        df_all,
-        selected_make,
-        lams_only,
-        create_listing_only,
-        transfer_rego_only,
-        stock_number,
-        rego_number,
-        sort_by,
-        sort_order
-    )
+    filters = (selected_make, lams_only, create_listing_only, transfer_rego_only,
+               stock_number, rego_number, sort_by, sort_order)
+    with diagnostics.phase("Filter and sort"):
+        if database is None:
+            positions = filter_positions(df_all, sort_index, *filters, counts=diagnostics.filter_counts)
+            total_rows = len(positions)
+        else:
+            # Only the count here; the visible page is fetched with LIMIT/OFFSET below
+            total_rows = database.count(*filters)
     
     # ============================
-    # Display the filtered DataFrame
+    # Tabs: current stock, rego expiry and history trends
     # ============================
-    st.markdown("<br>", unsafe_allow_html=True)  # Add some space
-    display_dataframe(df_filtered)
+    stock_tab, expiry_tab, trends_tab = st.tabs(["📋 Stock", "📅 Expiry", "📊 Trends"])
+    
+    with stock_tab:
+        # ============================
+        # Select the visible page
+        # ============================
+        if page_size == "All" or total_rows <= page_size:
+            first_row = 1
+            limit = None
+        else:
+            page_count = -(-total_rows // page_size)  # Ceiling division
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+            first_row = (page - 1) * page_size + 1
+            limit = page_size
+        if database is None:
+            page_positions = positions[first_row - 1:][:limit]
+        else:
+            with diagnostics.phase("Filter and sort"):
+                page_positions = database.positions(*filters, limit=limit, offset=first_row - 1)
+    
+        # ============================
+        # Display the visible rows only
+        # ============================
+        st.markdown("<br>", unsafe_allow_html=True)  # Add some space
+        if total_rows:
+            st.caption(f"Showing {first_row}–{first_row + len(page_positions) - 1} of {total_rows} vehicles")
+        with diagnostics.phase("Render table"):
+            diagnostics.payload_bytes = display_dataframe(df_all.iloc[page_positions])
+    
+    with expiry_tab:
+        with diagnostics.phase("Expiry"):
+            display_expiry(get_expiry_index(snapshot.path, snapshot.signature, df_all, sort_index), df_all)
+    
+    with trends_tab:
+        with diagnostics.phase("Trends"):
+            display_trends(load_history_aggregates(history_signature()))
 
     # ============================
     # Footer (Optional)
@@ -464,6 +573,13 @@ def main():
         unsafe_allow_html=True
     )
 
+    diagnostics.finish()
+
+    # Record the session's first render in the startup report
+    if 'first_render_recorded' not in st.session_state:
+        st.session_state.first_render_recorded = True
+        STARTUP_REPORT.record_session(perf_counter() - RUN_STARTED, snapshot_wait)
+
 if __name__ == "__main__":
     main()
 
@@ -7,9 +7,22 @@ Author: NAOJOH
 
 import streamlit as st
 import pandas as pd
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from streamlit_pills import pills  # Importing the pills function
+from stock_dates import parse_date_column
+from stock_snapshot import shared_provider
+from stock_status import (CHECK_REGO_NUMBER, CREATE_LISTING, EXPIRES_SOON, FLAGS_COLUMN, REGO_EXPIRED,
+                          TRANSFER_REGO, dated_flags, stored_flags)
+
+# Rego Status values that call for a rego transfer
+TRANSFER_REGO_STATUSES = ['no rego found', 'rego not under procycles']
+
+# Status badges shown for each status flag, in display order
+STATUS_BADGES = [
+    (TRANSFER_REGO, '❗ Transfer rego'),
+    (CHECK_REGO_NUMBER, '❓ Check rego number'),
+    (CREATE_LISTING, '❗ Create listing'),
+]
 
 # ============================
 # Set Page Configuration
@@ -189,11 +202,22 @@ def add_custom_css():
 # Function Definitions
 # ============================
 
-@st.cache_data
 def load_data(file_path):
     """Load data from the specified Excel file and fill NaN values."""
     return pd.read_excel(file_path).fillna('')
 
+def stock_status_file():
+    """Return the name of today's Stock Status workbook."""
+    return f'Stock Status {datetime.now().strftime("%d-%m-%Y")}.xlsx'
+
+def get_data_provider():
+    """Return the process-wide provider that picks up new or modified Stock Status workbooks.
+
+    The workbook name is resolved on every poll, so the provider moves to the
+    new day's workbook once it appears.
+    """
+    return shared_provider(stock_status_file, load_data)
+
 def preprocess_data(df):
     """Preprocess the DataFrame by converting columns and checking for required columns."""
     required_columns = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'VIN',
@@ -206,9 +230,12 @@ def preprocess_data(df):
         # Convert date columns
         date_columns = ['Date Into Stock', 'Rego Expiry', 'Date Listed']
         for col in date_columns:
-            df[col + '_dt'] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+            df[col + '_dt'] = parse_date_column(df[col])
         # Convert price to numeric
         df['Listed Price_num'] = pd.to_numeric(df['Listed Price'], errors='coerce')
+        # Evaluate the day-independent status rules; the transfer rule reads 'Rego Details'
+        transfer = df['Rego Status'].astype(str).str.lower().isin(TRANSFER_REGO_STATUSES)
+        df[FLAGS_COLUMN] = stored_flags(df.assign(**{'Rego Details': df['Rego Status'].where(transfer, '')}))
         return df
 
 def create_inactive_make_button(make):
@@ -235,53 +262,23 @@ def truncate_vin(vin):
     else:
         return vin  # Return as is if VIN is shorter than 7 characters or not a string
 
-def create_status_buttons(rego_status, rego_number, date_listed):
-    """Create a composite status button combining Rego Status, Rego Number, and Date Listed."""
-    buttons = []
-
-    # Rego Status Buttons
-    if rego_status.lower() in ['no rego found', 'rego not under procycles']:
-        buttons.append('<span class="status-button" style="background-color:#A9A9A9;">❗ Transfer rego</span>')
-
-    # Unknown Rego Number Button
-    if not rego_number.strip():
-        buttons.append('<span class="status-button" style="background-color:#A9A9A9;">❓ Check rego number</span>')
-
-    # No Listing Found Button
-    if not date_listed.strip():
-        buttons.append('<span class="status-button" style="background-color:#A9A9A9;">❗ Create listing</span>')
-
+def create_status_buttons(flags):
+    """Create a composite status button from a vehicle's status flags."""
+    buttons = [
+        f'<span class="status-button" style="background-color:#A9A9A9;">{label}</span>'
+        for flag, label in STATUS_BADGES if flags & flag
+    ]
     # Combine all buttons into a single string
-    return ' '.join(buttons) if buttons else ''
-
-def create_rego_expiry_button(expiry_date):
-    """Create an inactive button indicating 'Expired' or 'Expires soon' based on the expiry date."""
-    try:
-        # Convert the expiry date to a datetime object
-        expiry_datetime = pd.to_datetime(expiry_date, errors='coerce', dayfirst=True)
-        # Current date and one month from today
-        today = datetime.now()
-        one_month_from_today = today + timedelta(days=30)
-        # Determine status
-        if pd.isnull(expiry_datetime):
-            status = "Unknown"
-            color = "#A9A9A9"  # Grey
-        elif expiry_datetime < today:
-            status = "Expired"
-            color = "#FF6347"  # Tomato Red
-        elif expiry_datetime < one_month_from_today:
-            status = "Expires soon"
-            color = "#FFA500"  # Orange
-        else:
-            status = "Valid"
-            color = "#32CD32"  # Lime Green
-        # Only show button if status is 'Expired' or 'Expires soon'
-        if status in ["Expired", "Expires soon"]:
-            return f' <span class="status-button" style="background-color:{color}; margin-left: 4px;">{status}</span>'
-        else:
-            return ''  # No button if status is 'Valid' or 'Unknown'
-    except Exception:
-        return ''  # If conversion fails, return nothing
+    return ' '.join(buttons)
+
+def create_rego_expiry_button(flags):
+    """Create an inactive button indicating 'Expired' or 'Expires soon' from a vehicle's status flags."""
+    if flags & REGO_EXPIRED:
+        return ' <span class="status-button" style="background-color:#FF6347; margin-left: 4px;">Expired</span>'
+    elif flags & EXPIRES_SOON:
+        return ' <span class="status-button" style="background-color:#FFA500; margin-left: 4px;">Expires soon</span>'
+    else:
+        return ''  # No button if the rego is valid or its expiry unknown
 
 def filter_data(df, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number, sort_by, sort_order):
     """Apply filters, search, and sorting to the DataFrame and return a copy."""
@@ -304,11 +301,11 @@ def filter_data(df, selected_make, lams_only, create_listing_only, transfer_rego
     
     # Filter for Create Listing Only
     if create_listing_only:
-        df_filtered = df_filtered[df_filtered['Status'].str.contains('Create listing', case=False, na=False)].copy()
+        df_filtered = df_filtered[(df_filtered[FLAGS_COLUMN] & CREATE_LISTING) != 0].copy()
     
     # Filter for Transfer Rego Only
     if transfer_rego_only:
-        df_filtered = df_filtered[df_filtered['Status'].str.contains('Transfer rego', case=False, na=False)].copy()
+        df_filtered = df_filtered[(df_filtered[FLAGS_COLUMN] & TRANSFER_REGO) != 0].copy()
     
     # ----------------------------
     # Apply Search
@@ -377,21 +374,23 @@ def display_dataframe(df_filtered):
     # ----------------------------
     df_filtered['VIN'] = df_filtered['VIN'].apply(truncate_vin)
     
+    # ----------------------------
+    # Add today's expiry flags to the stored status flags
+    # ----------------------------
+    flags = (df_filtered[FLAGS_COLUMN].to_numpy() | dated_flags(df_filtered)).tolist()
+    
     # ----------------------------
     # Process 'Rego Expiry' column: keep date as text and add status button
     # ----------------------------
-    df_filtered['Rego Expiry'] = df_filtered.apply(
-        lambda row: f"{row['Rego Expiry']} {create_rego_expiry_button(row['Rego Expiry'])}",
-        axis=1
-    )
+    df_filtered['Rego Expiry'] = [
+        f"{expiry} {create_rego_expiry_button(row_flags)}"
+        for expiry, row_flags in zip(df_filtered['Rego Expiry'], flags)
+    ]
     
     # ----------------------------
-    # Create 'Status' column by combining 'Rego Status', 'Rego Number', and 'Date Listed'
+    # Create 'Status' column from the status flags
     # ----------------------------
-    df_filtered['Status'] = df_filtered.apply(
-        lambda row: create_status_buttons(row['Rego Status'], row['Rego Number'], row['Date Listed']),
-        axis=1
-    )
+    df_filtered['Status'] = [create_status_buttons(row_flags) for row_flags in flags]
     
     # ----------------------------
     # Define columns to display
@@ -403,7 +402,7 @@ def display_dataframe(df_filtered):
     # ----------------------------
     # Drop unnecessary columns
     # ----------------------------
-    columns_to_drop = ['Date Into Stock_dt', 'Rego Expiry_dt', 'Date Listed_dt', 'Listed Price_num', 'LAMS?']
+    columns_to_drop = ['Date Into Stock_dt', 'Rego Expiry_dt', 'Date Listed_dt', 'Listed Price_num', 'LAMS?', FLAGS_COLUMN]
     df_filtered = df_filtered.drop(columns=columns_to_drop, errors='ignore')
     
     # ----------------------------
@@ -427,29 +426,22 @@ def main():
     # ============================
     # Load and Preprocess Data
     # ============================
-    DATE = datetime.now()
-    RESULT_FILE = f'Stock Status {DATE.strftime("%d-%m-%Y")}.xlsx'
-
-    if os.path.exists(RESULT_FILE):
-        try:
-            df_all = load_data(RESULT_FILE)
-        except Exception as e:
-            st.error(f"⚠️ Error reading the Excel file: {e}")
-            st.stop()
-    else:
-        st.error(f"⚠️ File {RESULT_FILE} does not exist.")
+    # The first load blocks; later files are picked up by the background provider
+    provider = get_data_provider()
+    snapshot = provider.get()
+    if snapshot is None:
+        if provider.error is not None:
+            st.error(f"⚠️ Error reading the Excel file: {provider.error}")
+        else:
+            st.error(f"⚠️ File {stock_status_file()} does not exist.")
         st.stop()
+    if provider.is_stale():
+        st.warning(f"⚠️ {provider.missing_path} does not exist yet; showing {snapshot.path} "
+                   f"from {snapshot.modified.strftime('%d-%m-%Y %H:%M')}.")
     
-    # Preprocess Data
-    df_all = preprocess_data(df_all)
-
-    # Create 'Status' column if not already present
-    if 'Status' not in df_all.columns:
-        df_all['Status'] = df_all.apply(
-            lambda row: create_status_buttons(row['Rego Status'], row['Rego Number'], row['Date Listed']),
-            axis=1
-        )
-        
+    # Preprocess a copy; the snapshot is shared by all sessions
+    df_all = preprocess_data(snapshot.data.copy())
+
         # Title and Subtitle
     st.title("🏍️ Used Stock Dashboard")
     st.markdown("### Monitor and Analyze Your Used Stock Inventory")
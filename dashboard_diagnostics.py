@@ -0,0 +1,133 @@
+# dashboard_diagnostics.py
+
+"""
+Opt-in per-rerun diagnostics for the stock dashboard.
+
+Enabled for a session with the ?diagnostics=1 query parameter, or for every
+session with DASHBOARD_DIAGNOSTICS=1 in the server's environment. Each rerun
+then times the phases of the dashboard's main(), records the rows remaining
+after each filter and the size of the rendered table HTML, and shows them in
+a collapsible sidebar panel. Adding ?profile=1 also captures a cProfile of
+the rerun. Every diagnosed rerun is appended to a rolling log file.
+
+Disabled diagnostics cost one check per phase.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import streamlit as st
+
+# ================================
+# Constants and Configuration
+# ================================
+
+DIAGNOSTICS_ENV = 'DASHBOARD_DIAGNOSTICS'
+DIAGNOSTICS_PARAM = 'diagnostics'
+PROFILE_PARAM = 'profile'
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+# Rolling log of diagnosed reruns
+LOG_FILE = 'dashboard_diagnostics.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# Functions listed from a captured profile
+PROFILE_TOP_FUNCTIONS = 25
+
+# ================================
+# Rolling Log
+# ================================
+
+@st.cache_resource
+def get_diagnostics_log():
+    """Return the process-wide logger writing diagnosed reruns to the rolling log file."""
+    logger = logging.getLogger('dashboard_diagnostics')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+# ================================
+# Rerun Diagnostics
+# ================================
+
+class RerunDiagnostics:
+    """Timings, filter row counts and an optional profile for one dashboard rerun."""
+
+    def __init__(self, enabled, profile=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.filter_counts = {} if enabled else None
+        self.payload_bytes = None
+        self.profile_text = None
+        self._profiler = cProfile.Profile() if enabled and profile else None
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    @classmethod
+    def from_request(cls):
+        """Enable diagnostics from the query parameters or the environment."""
+        params = st.query_params
+        enabled = (params.get(DIAGNOSTICS_PARAM, '').lower() in TRUE_VALUES
+                   or os.environ.get(DIAGNOSTICS_ENV, '').lower() in TRUE_VALUES)
+        return cls(enabled, profile=params.get(PROFILE_PARAM, '').lower() in TRUE_VALUES)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the rerun; phases with the same name accumulate."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        """Stop profiling, show the sidebar panel and append the rerun to the rolling log."""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        if self._profiler is not None:
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            self.profile_text = stream.getvalue()
+        self.render_panel(total)
+        get_diagnostics_log().info(json.dumps({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'total_ms': round(total * 1000, 1),
+            'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            'filter_rows': self.filter_counts,
+            'payload_bytes': self.payload_bytes,
+            'profiled': self.profile_text is not None,
+        }))
+
+    def render_panel(self, total):
+        with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+            st.markdown(f"**Rerun:** {total * 1000:.0f} ms")
+            for name, seconds in self.phases.items():
+                st.markdown(f"- {name}: {seconds * 1000:.1f} ms")
+            if self.filter_counts:
+                st.markdown("**Rows after each filter**")
+                for step, rows in self.filter_counts.items():
+                    st.markdown(f"- {step}: {rows}")
+            if self.payload_bytes is not None:
+                st.markdown(f"**Table HTML:** {self.payload_bytes / 1024:.1f} KB")
+            if self.profile_text is not None:
+                st.markdown("**Profile** (cumulative)")
+                st.code(self.profile_text, language=None)
@@ -0,0 +1,97 @@
+# dashboard_startup.py
+
+"""
+Cold-start warm-up and startup timing for the stock dashboard.
+
+Streamlit only executes a dashboard script when the first session connects, so
+without a warm-up the first visitor after a restart pays for the page's
+imports and the workbook parse. Launching the dashboard through this module
+imports those modules and loads the result workbook into the shared
+process-wide snapshot provider on a background thread while the server starts;
+the provider then loads each new result file in the background as it arrives.
+
+Every session's time to first render is recorded in a process-wide startup
+report and logged to the console.
+
+Usage:
+    python dashboard_startup.py [dashboard.py] [streamlit options...]
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+from stock_snapshot import shared_provider
+
+# ================================
+# Constants and Configuration
+# ================================
+
+DASHBOARD_SCRIPT = 'dashboard.py'
+RESULT_FILE = 'used_stock_data.xlsx'
+
+# Modules the dashboard imports on its first run
+WARM_IMPORTS = ['pandas', 'streamlit', 'streamlit_pills', 'stock_query', 'stock_sql', 'stock_history']
+
+# ================================
+# Startup Report
+# ================================
+
+class StartupReport:
+    """Process-wide record of the warm-up and each session's first render."""
+
+    def __init__(self):
+        self.process_started = time.perf_counter()
+        self.warmup_seconds = None
+        self.sessions = []
+        self._lock = threading.Lock()
+
+    def record_warmup(self, seconds):
+        self.warmup_seconds = seconds
+        print(f"[startup] Snapshot warmed up in {seconds:.2f}s")
+
+    def record_session(self, render_seconds, wait_seconds):
+        """Record a session's first render time and how much of it was spent waiting for the snapshot."""
+        with self._lock:
+            self.sessions.append((render_seconds, wait_seconds))
+            number = len(self.sessions)
+        print(f"[startup] Session {number}: first render {render_seconds:.2f}s "
+              f"(snapshot wait {wait_seconds:.2f}s, "
+              f"{time.perf_counter() - self.process_started:.0f}s after start)")
+
+REPORT = StartupReport()
+
+# ================================
+# Warm-up
+# ================================
+
+def warm_up(file_path, load):
+    """Import the dashboard's modules and load the snapshot into the shared provider."""
+    start = time.perf_counter()
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
+    shared_provider(file_path, load).get()
+    REPORT.record_warmup(time.perf_counter() - start)
+
+def start_warm_up(file_path=RESULT_FILE):
+    """Start the warm-up on a background thread so the server starts accepting sessions at once."""
+    from stock_sql import snapshot_loader
+    thread = threading.Thread(target=warm_up, args=(file_path, snapshot_loader()), name='dashboard-warmup', daemon=True)
+    thread.start()
+    return thread
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    from streamlit.web import cli as streamlit_cli
+
+    # Warm up through the imported module so the dashboard sees the same report
+    import dashboard_startup
+
+    script_arg = sys.argv[1] if len(sys.argv) > 1 else DASHBOARD_SCRIPT
+    dashboard_startup.start_warm_up()
+    sys.argv = ['streamlit', 'run', script_arg, *sys.argv[2:]]
+    sys.exit(streamlit_cli.main())
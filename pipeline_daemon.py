@@ -0,0 +1,165 @@
+# pipeline_daemon.py
+
+"""
+Long-running cleaning pipeline that reacts to exports dropped in raw_data/.
+
+The daemon polls for the day's DMS export (StockDDMMYY.dat) and Autogate
+export (autogate_data_DDMMYY.xlsx). A file is only read once its size and
+modification time have held still for the settle time, so an export still
+being copied is never parsed half-written. When a settled file is new or has
+changed, only its own stage is run again; the other export's cleaned frame is
+reused from the previous run, and the certificate folder is re-catalogued.
+Once both of the day's exports are in, the merge step publishes the result
+workbook, which is written to a temporary file and swapped in, so the
+dashboards only ever see a complete snapshot. Runs whose inputs match the
+recorded fingerprint are skipped, so restarting the daemon is cheap. An
+export is only marked as handled once its stage has run, and the merge stays
+pending until the result is published, so a failed stage or publish (the
+share briefly unreachable, the workbook locked in Excel) is retried on the
+next poll.
+
+The folder is polled rather than watched with inotify: it holds a handful of
+files, polling costs two stat calls per interval and it works the same on
+the Windows share the exports are dropped on.
+
+Usage:
+    python pipeline_daemon.py [poll_seconds] [settle_seconds]
+"""
+
+import sys
+import time
+import traceback
+from datetime import datetime
+
+import clean_data
+from rego_mirror import scan_certificates
+from stage_scheduler import StageScheduler
+from stock_fingerprint import input_fingerprint, result_is_current
+from stock_snapshot import file_signature
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Seconds between polls of the drop folder
+POLL_SECONDS = 2.0
+
+# Seconds a file's size and modification time must hold still before it is read
+SETTLE_SECONDS = 5.0
+
+# ================================
+# Drop Folder
+# ================================
+
+class SettledFiles:
+    """Tracks files whose signature has not changed for the settle time."""
+
+    def __init__(self, settle_seconds=SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self.seen = {}
+
+    def poll(self, path, now=None):
+        """Return the file's signature once it has settled, otherwise None."""
+        now = time.monotonic() if now is None else now
+        signature = file_signature(path)
+        if signature is None or signature[1] == 0:
+            self.seen.pop(path, None)
+            return None
+        previous = self.seen.get(path)
+        if previous is None or previous[0] != signature:
+            self.seen[path] = (signature, now)
+            return None
+        return signature if now - previous[1] >= self.settle_seconds else None
+
+# ================================
+# Pipeline Daemon
+# ================================
+
+class PipelineDaemon:
+    """Re-runs the pipeline stages whose export has arrived and publishes the merged result."""
+
+    def __init__(self, poll_seconds=POLL_SECONDS, settle_seconds=SETTLE_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.files = SettledFiles(settle_seconds)
+        self.day = None
+        self.results = {}
+        self.ran_with = {}
+        self.unpublished = False
+
+    def stage_inputs(self):
+        """Return {stage: (export path, stage function)} for the current day."""
+        return {
+            'autogate': (clean_data.AUTOGATE_EXCEL_FILE, clean_data.clean_autogate_data),
+            'stock': (clean_data.USED_STOCK_DATA_FILE, clean_data.load_used_stock_data),
+        }
+
+    def roll_over(self, now):
+        """Switch to a new day's exports, dropping the previous day's stage results."""
+        if now.date() != self.day:
+            clean_data.set_run_date(now)
+            self.day = now.date()
+            self.results = {}
+            self.ran_with = {}
+            self.unpublished = False
+            print(f"[daemon] Waiting for {clean_data.USED_STOCK_DATA_FILE} and {clean_data.AUTOGATE_EXCEL_FILE}")
+
+    def step(self, now=None):
+        """Poll the exports once and run the affected stages; return True if the pipeline ran."""
+        self.roll_over(now or datetime.now())
+        inputs = self.stage_inputs()
+        signatures = {stage: self.files.poll(path) for stage, (path, _) in inputs.items()}
+        stale = [stage for stage, signature in signatures.items()
+                 if signature is not None and signature != self.ran_with.get(stage)]
+        retry_publish = self.unpublished and all(stage in self.results for stage in inputs)
+        if not stale and not retry_publish:
+            return False
+
+        # Re-run the stages whose export changed, alongside a fresh certificate catalogue
+        start = time.perf_counter()
+        stages = StageScheduler()
+        stages.add('certificates', scan_certificates, clean_data.REGO_CERT_FOLDER)
+        for stage in stale:
+            stages.add(stage, inputs[stage][1])
+        stages.start()
+        for stage in stale:
+            # The signature is only recorded once the stage succeeds, so a failed stage is retried
+            self.results.pop(stage, None)
+            self.results[stage] = stages.result(stage)
+            self.ran_with[stage] = signatures[stage]
+            self.unpublished = True
+        print(f"[daemon] Ran {', '.join(stale) or 'certificates (retrying publish)'}; {stages.report()}")
+
+        if any(stage not in self.results for stage in inputs):
+            return True
+        catalogue = stages.result('certificates')
+        run_inputs = input_fingerprint([path for path, _ in inputs.values()], catalogue, self.day)
+        if result_is_current(clean_data.RESULT_FILE, run_inputs):
+            print(f"[daemon] Inputs unchanged; {clean_data.RESULT_FILE} is up to date")
+            self.unpublished = False
+            return True
+        clean_data.clean_used_stock_data(self.results['autogate'], stock_df=self.results['stock'],
+                                         catalogue=catalogue, inputs=run_inputs)
+        self.unpublished = False
+        print(f"[daemon] Published {clean_data.RESULT_FILE} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def run_forever(self):
+        """Poll until interrupted, logging failed runs and carrying on."""
+        while True:
+            try:
+                self.step()
+            except Exception:
+                print(f"[daemon] Pipeline run failed:\n{traceback.format_exc()}")
+            time.sleep(self.poll_seconds)
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    poll_arg = float(sys.argv[1]) if len(sys.argv) > 1 else POLL_SECONDS
+    settle_arg = float(sys.argv[2]) if len(sys.argv) > 2 else SETTLE_SECONDS
+    try:
+        PipelineDaemon(poll_arg, settle_arg).run_forever()
+    except KeyboardInterrupt:
+        print("[daemon] Stopped")
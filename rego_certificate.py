@@ -0,0 +1,608 @@
+# rego_certificate.py
+
+"""
+Rego certificate text extraction.
+
+The certificate fields sit on fixed lines of the first page (plate on line 3,
+holder on line 7, expiry on lines 10-13, "LA." condition on lines 15-17), so
+the fast extractor locates only page 0's content stream, decodes its text
+operators and stops as soon as those lines have been produced. Anything it
+cannot handle (object streams, unsupported filters, an empty holder name or
+expiry) falls back to the full PyPDF2 path. PyPDF2 is only imported when that fallback is
+first needed, so runs that never reach it do not pay for loading it.
+"""
+
+import functools
+import io
+import math
+import re
+import struct
+import zlib
+
+# ================================
+# Constants and Configuration
+# ================================
+
+DATE_PATTERN = r"\d{2}-\d{2}-\d{4}"
+
+# Number of first-page lines the certificate fields are read from
+CERT_LINE_COUNT = 18
+
+# Space width PyPDF2 assumes for fonts without width tables (thousandths of a unit)
+SPACE_WIDTH = 200.0
+
+# Space widths PyPDF2 uses for the standard 14 fonts
+DEFAULT_SPACE_WIDTHS = {
+    b'/Courier': 600, b'/Courier-Bold': 600, b'/Courier-BoldOblique': 600, b'/Courier-Oblique': 600,
+    b'/Helvetica': 278, b'/Helvetica-Bold': 278, b'/Helvetica-BoldOblique': 278, b'/Helvetica-Oblique': 278,
+    b'/Times-Roman': 250, b'/Times-Bold': 250, b'/Times-BoldItalic': 250, b'/Times-Italic': 250,
+    b'/Symbol': 250, b'/ZapfDingbats': 278,
+}
+
+# Use the lightweight extractor before falling back to PyPDF2
+FAST_EXTRACTOR = True
+
+EMPTY_REGO_INFO = {
+    "rego_name": None,
+    "is_lam": False,
+    "expiry_date": None
+}
+
+# PDF syntax patterns
+REF_PATTERN = re.compile(rb'(\d+)\s+(\d+)\s+R')
+OBJECT_PATTERN = re.compile(rb'(?<![0-9])(\d+)\s+\d+\s+obj\b')
+VALUE_PATTERN = re.compile(rb'\d+\s+\d+\s+R|\[[^\]]*\]|/[^\s/\[\]()<>{}%]+|[-+]?(?:\d+\.?\d*|\.\d+)|true|false')
+HEX_PAIR_PATTERN = re.compile(rb'<([0-9A-Fa-f]*)>\s*<([0-9A-Fa-f]*)>')
+HEX_RANGE_PATTERN = re.compile(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(?:<([0-9A-Fa-f]*)>|\[([^\]]*)\])')
+STARTXREF_PATTERN = re.compile(rb'startxref\s+(\d+)')
+ROOT_PATTERN = re.compile(rb'/Root\s+(\d+)\s+\d+\s+R')
+
+# Content stream syntax, after literal strings are replaced by numbered placeholders ('(N)')
+LITERAL_DELIMITER_PATTERN = re.compile(rb'[()\\]')
+CONTENT_OPERAND = (
+    rb'\(\d+\)'                                # literal string placeholder
+    rb'|<<(?:[^<>]|<[^<>]*>)*>>'                 # dictionary (marked-content properties)
+    rb'|<[0-9A-Fa-f\s]*>'                       # hex string
+    rb'|\[[^\]]*\]'                              # array
+    rb'|/[^\s/\[\]()<>{}%]*(?![^\s/\[\]()<>{}%])'  # name
+    rb'|[-+]?(?:\d+\.?\d*|\.\d+)(?![\d.])'        # number
+)
+# One operator with the operands before it; operands are only parsed for the text operators
+INSTRUCTION_PATTERN = re.compile(rb"((?:(?:%s)\s*)*)([A-Za-z'\"*][A-Za-z0-9'\"*]*)" % CONTENT_OPERAND)
+STRING_OPERAND_PATTERN = re.compile(rb'\((\d+)\)|<([0-9A-Fa-f\s]*)>')
+TJ_ITEM_PATTERN = re.compile(rb'\((\d+)\)|<([0-9A-Fa-f\s]*)>|([-+]?(?:\d+\.?\d*|\.\d+))')
+TEXT_OPERATORS = {b'BT', b'q', b'Q', b'cm', b'Tf', b'TL', b'Td', b'TD', b'Tm', b'T*',
+                  b'Tj', b"'", b'"', b'TJ', b'Do', b'BI'}
+LITERAL_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+                   b'(': b'(', b')': b')', b'\\': b'\\'}
+ESCAPE_PATTERN = re.compile(rb'\\([0-7]{1,3}|\r\n|[\r\n]|.)', re.S)
+
+# Maps ASCII85 characters '!'-'u' to their digit values 0-84
+ASCII85_DIGITS = bytes((code - 33) % 256 for code in range(256))
+
+# ================================
+# Lightweight First-Page Extractor
+# ================================
+
+def _xref_offsets(data, position):
+    """Read object offsets from a classic xref table chain, newest section first."""
+    offsets = {}
+    seen = set()
+    while position is not None and position not in seen:
+        seen.add(position)
+        if not data.startswith(b'xref', position):
+            raise ValueError("Cross-reference stream")
+        trailer = data.find(b'trailer', position)
+        if trailer == -1:
+            raise ValueError("Trailer not found")
+        tokens = data[position + 4:trailer].split()
+        index = 0
+        while index + 1 < len(tokens):
+            first, count = int(tokens[index]), int(tokens[index + 1])
+            index += 2
+            for number in range(first, first + count):
+                offset, kind = tokens[index], tokens[index + 2]
+                if kind == b'n':
+                    offsets.setdefault(number, int(offset))
+                index += 3
+        previous = re.search(rb'/Prev\s+(\d+)', data[trailer:trailer + 1024])
+        position = int(previous.group(1)) if previous else None
+    return offsets
+
+def _object_offsets(data):
+    """Map object numbers to the offset of their 'N G obj' header.
+
+    Uses the xref table when present and falls back to scanning the file.
+    """
+    start_xref = STARTXREF_PATTERN.search(data, max(0, len(data) - 1024))
+    if start_xref is not None:
+        try:
+            return _xref_offsets(data, int(start_xref.group(1)))
+        except (ValueError, IndexError):
+            pass
+    # Later definitions overwrite earlier ones, as with incremental updates
+    return {int(match.group(1)): match.start() for match in OBJECT_PATTERN.finditer(data)}
+
+def _object_body(data, offsets, number):
+    """Return the bytes between 'N 0 obj' and 'endobj' for an indirect object."""
+    header = OBJECT_PATTERN.match(data, offsets[number]) if number in offsets else None
+    if header is None or int(header.group(1)) != number:
+        raise LookupError(f"Object {number} not found (possibly in an object stream)")
+    end = data.find(b'endobj', header.end())
+    return data[header.end():end if end != -1 else len(data)]
+
+def _dict_entry(body, key):
+    """Return the raw value of a dictionary entry (reference, dictionary, array, name or number)."""
+    match = re.search(rb'/%s(?![A-Za-z0-9])\s*' % key, body)
+    if match is None:
+        return None
+    start = match.end()
+    if body.startswith(b'<<', start):
+        # Inline dictionary: scan to the matching '>>'
+        depth = 0
+        for position in range(start, len(body) - 1):
+            pair = body[position:position + 2]
+            if pair == b'<<':
+                depth += 1
+            elif pair == b'>>':
+                depth -= 1
+                if depth == 0:
+                    return body[start:position + 2]
+        return None
+    value = VALUE_PATTERN.match(body, start)
+    return value.group(0) if value else None
+
+def _resolve(data, offsets, value):
+    """Return the referenced object's body for a reference, otherwise the value itself."""
+    match = REF_PATTERN.fullmatch(value.strip()) if value else None
+    return _object_body(data, offsets, int(match.group(1))) if match else value
+
+def _numbers(value):
+    """Return the numbers in an array value."""
+    return [float(number) for number in re.findall(rb'[-+]?(?:\d+\.?\d*|\.\d+)', value)]
+
+def _stream_data(data, offsets, number):
+    """Return the decoded stream of an indirect stream object."""
+    body = _object_body(data, offsets, number)
+    start = body.find(b'stream')
+    end = body.rfind(b'endstream')
+    if start == -1 or end == -1:
+        raise ValueError(f"Object {number} is not a stream")
+    header = body[:start]
+    raw = body[start + len(b'stream'):end]
+    raw = raw[2:] if raw.startswith(b'\r\n') else raw[1:]
+    filters = _dict_entry(header, b'Filter') or b''
+    for name in re.findall(rb'/([A-Za-z0-9]+)', filters):
+        if name == b'FlateDecode':
+            # decompressobj tolerates trailing end-of-line bytes after the compressed data
+            raw = zlib.decompressobj().decompress(raw)
+        elif name == b'ASCII85Decode':
+            raw = _a85decode(raw)
+        else:
+            raise ValueError(f"Unsupported stream filter {name!r}")
+    return raw
+
+def _a85decode(raw):
+    """Decode ASCII85 data, five characters to four bytes per group."""
+    raw = re.sub(rb'\s', b'', raw).removesuffix(b'~>').replace(b'z', b'!!!!!')
+    padding = -len(raw) % 5
+    digits = (raw + b'u' * padding).translate(ASCII85_DIGITS)
+    values = [a * 52200625 + b * 614125 + c * 7225 + d * 85 + e
+              for a, b, c, d, e in zip(digits[0::5], digits[1::5], digits[2::5], digits[3::5], digits[4::5])]
+    decoded = struct.pack('>%dI' % len(values), *values)
+    return decoded[:len(decoded) - padding]
+
+def _first_page(data, offsets):
+    """Return the body of the first page object, following the page tree from the catalog."""
+    roots = ROOT_PATTERN.findall(data)
+    if not roots:
+        raise LookupError("Document catalog not found")
+    catalog = _object_body(data, offsets, int(roots[-1]))
+    node = _object_body(data, offsets, int(REF_PATTERN.match(_dict_entry(catalog, b'Pages')).group(1)))
+    # Descend through /Pages nodes to the first leaf /Page
+    while re.search(rb'/Type\s*/Pages\b', node):
+        kids = REF_PATTERN.search(_dict_entry(node, b'Kids'))
+        node = _object_body(data, offsets, int(kids.group(1)))
+    return node
+
+def _page_resources(data, offsets, page):
+    """Return the page's resource dictionary, inherited from parent nodes if needed."""
+    node = page
+    while True:
+        resources = _dict_entry(node, b'Resources')
+        if resources is not None:
+            return _resolve(data, offsets, resources)
+        parent = _dict_entry(node, b'Parent')
+        if parent is None:
+            return b''
+        node = _resolve(data, offsets, parent)
+
+@functools.lru_cache(maxsize=64)
+def _to_unicode_map(cmap):
+    """Parse the bfchar and bfrange sections of a ToUnicode CMap into {code: text}.
+
+    Cached, as certificates from the same generator embed the same CMaps.
+    """
+    mapping = {}
+    code_length = 1
+    for block in re.findall(rb'beginbfchar(.*?)endbfchar', cmap, re.S):
+        for source, target in HEX_PAIR_PATTERN.findall(block):
+            code_length = max(1, len(source) // 2)
+            mapping[int(source, 16)] = _hex_text(target)
+    for block in re.findall(rb'beginbfrange(.*?)endbfrange', cmap, re.S):
+        for low, high, target, targets in HEX_RANGE_PATTERN.findall(block):
+            code_length = max(1, len(low) // 2)
+            low, high = int(low, 16), int(high, 16)
+            if targets:
+                for offset, item in enumerate(re.findall(rb'<([0-9A-Fa-f]*)>', targets)):
+                    mapping[low + offset] = _hex_text(item)
+            else:
+                base, width = int(target, 16), max(4, len(target))
+                for code in range(low, high + 1):
+                    mapping[code] = _hex_text(b'%0*X' % (width, base + code - low))
+    return mapping, code_length
+
+def _hex_text(hex_digits):
+    """Decode a ToUnicode target (UTF-16BE, or a single byte) to text."""
+    if len(hex_digits) == 4:
+        code = int(hex_digits, 16)
+        if not 0xD800 <= code < 0xE000:
+            return chr(code)  # Fast path for single BMP characters
+    raw = bytes.fromhex(hex_digits.decode('ascii'))
+    return raw.decode('latin-1' if len(raw) < 2 else 'utf-16-be', 'surrogatepass')
+
+def _font_metrics(data, offsets, font):
+    """Return (decode, space_width) for a font dictionary, as PyPDF2 derives them."""
+    subtype = _dict_entry(font, b'Subtype')
+    encoding = _dict_entry(font, b'Encoding')
+    if encoding is not None and encoding.strip() not in (b'/WinAnsiEncoding', b'/StandardEncoding'):
+        raise ValueError(f"Unsupported font encoding {encoding!r}")
+    to_unicode = _dict_entry(font, b'ToUnicode')
+    if to_unicode is not None and REF_PATTERN.fullmatch(to_unicode.strip()):
+        mapping, code_length = _to_unicode_map(
+            _stream_data(data, offsets, int(REF_PATTERN.fullmatch(to_unicode.strip()).group(1)))
+        )
+    elif subtype is not None and subtype.strip() == b'/Type0':
+        raise ValueError("Composite font without a ToUnicode map")
+    else:
+        mapping, code_length = {}, 1
+    fallback = 'cp1252' if encoding is not None and encoding.strip() == b'/WinAnsiEncoding' else 'latin-1'
+
+    def decode(raw):
+        if not mapping:
+            return raw.decode(fallback, 'replace')
+        text = []
+        for position in range(0, len(raw), code_length):
+            chunk = raw[position:position + code_length]
+            code = int.from_bytes(chunk, 'big')
+            text.append(mapping[code] if code in mapping else chunk.decode(fallback, 'replace'))
+        return ''.join(text)
+
+    # Space width: base-14 defaults, then the width table, then half the average width
+    base_font = _dict_entry(font, b'BaseFont')
+    widths = _dict_entry(font, b'Widths')
+    descendants = _dict_entry(font, b'DescendantFonts')
+    space_width = DEFAULT_SPACE_WIDTHS.get(base_font.strip() if base_font else b'', SPACE_WIDTH) * 2
+    if descendants is not None:
+        descendant = _resolve(data, offsets, REF_PATTERN.search(_resolve(data, offsets, descendants)).group(0))
+        default_width = _dict_entry(descendant, b'DW')
+        space_width = (float(default_width) if default_width else 1000.0) / 2
+    elif widths is not None:
+        widths = _numbers(_resolve(data, offsets, widths))
+        first_char = int(float(_dict_entry(font, b'FirstChar') or 0))
+        if first_char <= 32 < first_char + len(widths) and widths[32 - first_char]:
+            space_width = widths[32 - first_char]
+        else:
+            positive = [width for width in widths if width > 0]
+            space_width = sum(positive) / max(1, len(positive)) / 2
+    return decode, space_width / 2
+
+class _PageFonts(dict):
+    """Font resources of a page, mapped to (decode, space_width) on first use."""
+
+    def __init__(self, data, offsets, page):
+        super().__init__()
+        self.data = data
+        self.offsets = offsets
+        resources = _page_resources(data, offsets, page)
+        font_dict = _resolve(data, offsets, _dict_entry(resources, b'Font') or b'')
+        self.references = {
+            b'/' + name: int(number)
+            for name, number in re.findall(rb'/([^\s/\[\]()<>{}%]+)\s+(\d+)\s+\d+\s+R', font_dict)
+        }
+
+    def __missing__(self, name):
+        if name not in self.references:
+            raise LookupError(f"Font {name!r} not found in page resources")
+        self[name] = _font_metrics(self.data, self.offsets, _object_body(self.data, self.offsets, self.references[name]))
+        return self[name]
+
+def _split_literals(content):
+    """Replace each literal string with a numbered placeholder '(N)', returning the new content and the raw strings.
+
+    Literal strings may contain balanced parentheses without escapes (as in
+    'PROCYCLES (HORNSBY) PTY LTD'), so string boundaries are found by tracking
+    the nesting depth over the parenthesis and backslash bytes alone.
+    """
+    parts = []
+    literals = []
+    depth = 0
+    start = end = 0
+    escaped = -1
+    for match in LITERAL_DELIMITER_PATTERN.finditer(content):
+        position = match.start()
+        if position == escaped:
+            continue  # Escaped delimiter inside a string
+        delimiter = content[position]
+        if delimiter == 0x5C:  # Backslash escapes the next byte inside a string
+            if depth:
+                escaped = position + 1
+        elif delimiter == 0x28:  # '('
+            if depth == 0:
+                start = position
+            depth += 1
+        elif depth:  # ')'
+            depth -= 1
+            if depth == 0:
+                parts.append(content[end:start])
+                parts.append(b'(%d)' % len(literals))
+                literals.append(content[start + 1:position])
+                end = position + 1
+        else:
+            raise ValueError("Unbalanced ')' in content stream")
+    if depth:
+        raise ValueError("Unterminated literal string in content stream")
+    if not literals:
+        return content, literals
+    parts.append(content[end:])
+    return b''.join(parts), literals
+
+def _unescape(match):
+    escape = match.group(1)
+    if escape[:1].isdigit():
+        return bytes([int(escape, 8) & 0xFF])
+    if escape in (b'\r\n', b'\r', b'\n'):
+        return b''  # Line continuation
+    return LITERAL_ESCAPES.get(escape, escape)
+
+def _string_bytes(literals, literal, hex_digits):
+    """Return the raw bytes of a string operand: a literal string placeholder's number or hex digits."""
+    if literal:
+        raw = literals[int(literal)]
+        return ESCAPE_PATTERN.sub(_unescape, raw) if b'\\' in raw else raw
+    hex_digits = re.sub(rb'\s', b'', hex_digits)
+    if len(hex_digits) % 2:
+        hex_digits += b'0'
+    return bytes.fromhex(hex_digits.decode('ascii'))
+
+def _multiply(m, n):
+    """Multiply two PDF transformation matrices given as [a, b, c, d, e, f]."""
+    return [
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    ]
+
+def _numbers_before(operands, count):
+    """Return the last count numeric operands of an instruction."""
+    values = operands.split()
+    if len(values) < count:
+        raise ValueError(f"Expected {count} operands, got {operands!r}")
+    return [float(value) for value in values[-count:]]
+
+def _text_lines(content, fonts, max_lines):
+    """Return up to max_lines text lines from a page content stream in drawing order.
+
+    Line and space breaks follow PyPDF2's extract_text rules (a new line when
+    the text position drops by more than 0.8 font heights, a space for large
+    horizontal gaps), so line numbers match the PyPDF2 path. fonts maps font
+    resource names to (decode, space_width).
+
+    The stream is matched one instruction (operands and operator) at a time,
+    only the text operators' operands are parsed, and parsing stops once
+    max_lines lines are complete.
+    """
+    identity = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    cm = identity
+    tm = list(identity)
+    previous_x = previous_y = 0.0
+    stack = []
+    font_size = 12.0
+    leading = 0.0
+    decode = lambda raw: raw.decode('latin-1')
+    space_width = 500.0  # PyPDF2's value before the first Tf
+    lines = []
+    line = ''
+    last = ''  # Last character written, '' before any text
+
+    def newline():
+        nonlocal line, last
+        if last and last != '\n':
+            lines.append(line)
+            line = ''
+            last = '\n'
+
+    def moved():
+        """Apply PyPDF2's line and space break rules after a position change."""
+        nonlocal previous_x, previous_y, line, last
+        a, b, c, d, e, f = tm
+        ca, cb, cc, cd, ce, cf = cm
+        m0, m1, m2, m3 = a * ca + b * cc, a * cb + b * cd, c * ca + d * cc, c * cb + d * cd
+        if m3 <= 1e-6:
+            raise ValueError("Only upright text is supported")
+        x = e * ca + f * cc + ce
+        y = e * cb + f * cd + cf
+        delta_x = x - previous_x
+        delta_y = y - previous_y
+        previous_x, previous_y = x, y
+        height = font_size * math.sqrt(abs(m0 * m3) + abs(m1 * m2))
+        if delta_y < -0.8 * height:
+            newline()
+        elif abs(delta_y) < 0.3 * height and abs(delta_x) > space_width / 1000.0 * height * 15:
+            if last and last != ' ':
+                line += ' '
+                last = ' '
+
+    def show_text(text):
+        nonlocal line, last
+        if text:
+            line += text
+            last = text[-1]
+        moved()
+
+    content, literals = _split_literals(content)
+    for operands, operator in INSTRUCTION_PATTERN.findall(content):
+        if operator not in TEXT_OPERATORS:
+            continue
+        if operator == b'Tj' or operator == b"'" or operator == b'"':
+            strings = STRING_OPERAND_PATTERN.findall(operands)
+            if strings:
+                if operator != b'Tj':
+                    tm[5] -= leading  # T* before showing the string
+                    moved()
+                show_text(decode(_string_bytes(literals, *strings[-1])))
+        elif operator == b'TJ':
+            for literal, hex_digits, number in TJ_ITEM_PATTERN.findall(operands):
+                if not number:
+                    show_text(decode(_string_bytes(literals, literal, hex_digits)))
+                elif abs(float(number)) >= space_width and line and line[-1] != ' ':
+                    show_text(' ')
+        elif operator == b'Tm':
+            tm = _numbers_before(operands, 6)
+            moved()
+        elif operator == b'Td' or operator == b'TD':
+            tx, ty = _numbers_before(operands, 2)
+            if operator == b'TD':
+                leading = -ty
+            tm[4] += tx * tm[0] + ty * tm[2]
+            tm[5] += tx * tm[1] + ty * tm[3]
+            moved()
+        elif operator == b'T*':
+            tm[5] -= leading
+            moved()
+        elif operator == b'BT':
+            tm = list(identity)
+        elif operator == b'Tf':
+            values = operands.split()
+            if len(values) < 2:
+                raise ValueError(f"Malformed Tf operands {operands!r}")
+            decode, space_width = fonts[values[-2]]
+            font_size = float(values[-1])
+        elif operator == b'TL':
+            leading = _numbers_before(operands, 1)[0]
+        elif operator == b'cm':
+            cm = _multiply(_numbers_before(operands, 6), cm)
+        elif operator == b'q':
+            stack.append((cm, font_size, leading, decode, space_width))
+        elif operator == b'Q':
+            if stack:
+                cm, font_size, leading, decode, space_width = stack.pop()
+            else:
+                cm = identity
+        elif operator == b'Do':
+            newline()
+        elif operator == b'BI':
+            raise ValueError("Inline images are not supported")
+        if len(lines) >= max_lines:
+            return lines[:max_lines]  # The remaining lines are never read
+    if line:
+        lines.append(line)
+    return lines[:max_lines]
+
+def first_page_lines(data, max_lines=CERT_LINE_COUNT):
+    """Return up to max_lines text lines from the first page using the lightweight parser."""
+    offsets = _object_offsets(data)
+    page = _first_page(data, offsets)
+    contents = _dict_entry(page, b'Contents')
+    if contents is None:
+        raise LookupError("First page has no content stream")
+    content = b'\n'.join(_stream_data(data, offsets, int(number)) for number, _ in REF_PATTERN.findall(contents))
+    return _text_lines(content, _PageFonts(data, offsets, page), max_lines)
+
+# ================================
+# PyPDF2 Extractor
+# ================================
+
+def pypdf2_first_page_lines(data):
+    """Return the first page's text lines using PyPDF2's full extractor."""
+    import PyPDF2  # Deferred: only needed when the fast path cannot parse a certificate
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return reader.pages[0].extract_text().split('\n')
+
+# ================================
+# Certificate Fields
+# ================================
+
+def parse_rego_lines(lines):
+    """
+    Extracts rego details from the first-page text lines of a certificate.
+
+    Raises:
+        ValueError: If the expiry date is not found in lines 10-13.
+    """
+    # Extract Rego Name
+    plate_number = lines[3].split()[0]
+    rego_name = lines[7][len(plate_number):].strip()
+
+    # Determine if "LA." condition exists
+    is_lam = any(line.startswith("LA.") for line in lines[15:17])
+
+    # Find the expiry date in lines 10-13
+    expiry_date = next(
+        (re.search(DATE_PATTERN, lines[i]).group(0)
+         for i in range(10, 14) if re.search(DATE_PATTERN, lines[i])),
+        None
+    )
+
+    if not expiry_date:
+        raise ValueError("Expiry date not found in lines 10-13")
+
+    return {
+        "rego_name": rego_name,
+        "is_lam": is_lam,
+        "expiry_date": expiry_date
+    }
+
+def extract_rego_info_from_bytes(data):
+    """
+    Extracts rego details from the bytes of a certificate PDF.
+
+    Returns:
+        dict: {
+            "rego_name": str or None,
+            "is_lam": bool,
+            "expiry_date": str or None
+        }
+    """
+    if FAST_EXTRACTOR:
+        try:
+            info = parse_rego_lines(first_page_lines(data))
+            if info["rego_name"] and info["expiry_date"]:
+                return info
+        except Exception:
+            pass  # Fall back to the full PyPDF2 extractor, as for empty fields
+    try:
+        return parse_rego_lines(pypdf2_first_page_lines(data))
+    except Exception:
+        return dict(EMPTY_REGO_INFO)
+
+def extract_rego_info(pdf_path):
+    """
+    Extracts rego details from a PDF file.
+
+    Returns:
+        dict: {
+            "rego_name": str or None,
+            "is_lam": bool,
+            "expiry_date": str or None
+        }
+    """
+    try:
+        with open(pdf_path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return dict(EMPTY_REGO_INFO)
+    return extract_rego_info_from_bytes(data)
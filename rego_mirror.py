@@ -0,0 +1,272 @@
+# rego_mirror.py
+
+"""
+Certificate catalogue and local mirror of the RMS certificate share.
+
+The share is listed once with os.scandir, which returns modification times
+and sizes with the directory listing instead of one stat round trip per
+file. Certificates that are needed are copied by a background thread pool
+into a local content-addressed cache (objects/<sha256>.pdf), so extraction
+reads from local disk and unchanged certificates are never fetched twice.
+The cache is bounded in size and evicts the least recently used blobs.
+
+Certificates archived into .zip files in the folder are catalogued from each
+archive's central directory alone; a needed member is streamed straight out
+of its archive, so archives never have to be unpacked.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# ================================
+# Constants and Configuration
+# ================================
+
+MIRROR_DIR = 'rego_mirror'
+
+# Upper bound on the size of the mirrored certificates
+MIRROR_MAX_BYTES = 512 * 1024 * 1024
+
+# Concurrent copies from the share; SMB latency rather than bandwidth is the limit
+PREFETCH_WORKERS = 8
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Errors that make one certificate unreadable: share failures, and archive members that are
+# missing, encrypted (RuntimeError), compressed with an unsupported method (NotImplementedError),
+# corrupt (zlib.error, BadZipFile) or truncated (EOFError)
+UNREADABLE_ERRORS = (OSError, KeyError, RuntimeError, NotImplementedError, EOFError,
+                     zlib.error, zipfile.BadZipFile)
+
+# A certificate on the share, with the signature used to detect changes; member is
+# the name inside the archive at path for archived certificates, otherwise None
+CertificateEntry = namedtuple('CertificateEntry', ['name', 'path', 'mtime_ns', 'size', 'member'],
+                              defaults=[None])
+
+# ================================
+# Certificate Catalogue
+# ================================
+
+def member_mtime_ns(info):
+    """Return an archive member's modification time, or 0 for an invalid DOS timestamp (e.g. all zeros)."""
+    try:
+        return int(datetime(*info.date_time).timestamp() * 1e9)
+    except (ValueError, OverflowError, OSError):
+        return 0  # Sorts as the oldest copy, so any dated certificate for the plate wins
+
+def scan_archive(archive_path):
+    """List the certificates inside a zip archive from its central directory."""
+    catalogue = []
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                name = info.filename.rsplit('/', 1)[-1]
+                catalogue.append(CertificateEntry(name, archive_path, member_mtime_ns(info), info.file_size, info.filename))
+    except (OSError, ValueError, zipfile.BadZipFile):
+        pass  # Unreadable archives are skipped like missing certificates
+    return catalogue
+
+def scan_certificates(folder):
+    """List the certificates in the folder and its zip archives with a single directory scan."""
+    catalogue = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.name.lower().endswith('.zip'):
+                catalogue.extend(scan_archive(entry.path))
+            else:
+                stat = entry.stat()
+                catalogue.append(CertificateEntry(entry.name, entry.path, stat.st_mtime_ns, stat.st_size))
+    return catalogue
+
+def certificate_source(entry):
+    """Return a path identifying the certificate, including the member name for archived ones."""
+    if entry.member is None:
+        return entry.path
+    return f'{entry.path}/{entry.member}'
+
+def open_certificate(entry):
+    """Open a certificate on the share for reading, streaming archive members from their zip."""
+    if entry.member is None:
+        return open(entry.path, 'rb')
+    with zipfile.ZipFile(entry.path) as archive:
+        # The member stream keeps the archive file open until it is closed
+        return archive.open(entry.member)
+
+def read_certificate(entry):
+    """Read a certificate's bytes straight from the share into memory."""
+    with open_certificate(entry) as file:
+        return file.read()
+
+def latest_certificates(catalogue, regos):
+    """Map each canonical plate to the most recently modified certificate naming it, or None."""
+    latest = dict.fromkeys(regos)
+    for entry in catalogue:
+        name = entry.name.upper()
+        for rego in regos:
+            if rego in name:
+                current = latest[rego]
+                if current is None or entry.mtime_ns > current.mtime_ns:
+                    latest[rego] = entry
+    return latest
+
+# ================================
+# Local Mirror
+# ================================
+
+class CertificateMirror:
+    """Size-bounded local copy of certificates, filled by a background prefetch pool.
+
+    The index maps each share path to the (mtime_ns, size) it was copied at and
+    the digest of its content; blobs used during this run are never evicted
+    before close(), which trims the cache to max_bytes and saves the index.
+    """
+
+    def __init__(self, cache_dir=MIRROR_DIR, max_bytes=MIRROR_MAX_BYTES, workers=PREFETCH_WORKERS):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.max_bytes = max_bytes
+        self.entries, self.blobs = self._load_index()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pinned = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rego-prefetch')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _load_index(self):
+        """Load the mirror index, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            return index['entries'], index['blobs']
+        except (OSError, ValueError, KeyError):
+            return {}, {}
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'entries': self.entries, 'blobs': self.blobs}, file)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.objects_dir, f'{digest}.pdf')
+
+    def _cached_digest(self, entry):
+        """Return the digest of an up-to-date mirrored copy of the entry, or None."""
+        record = self.entries.get(certificate_source(entry))
+        if (record and record['mtime_ns'] == entry.mtime_ns and record['size'] == entry.size
+                and record['digest'] in self.blobs and os.path.exists(self._blob_path(record['digest']))):
+            return record['digest']
+        return None
+
+    def _copy(self, entry):
+        """Copy one certificate into the mirror unless it is already there; return the local path."""
+        with self._lock:
+            digest = self._cached_digest(entry)
+            if digest is not None:
+                self._pinned.add(digest)
+                self.blobs[digest]['last_used'] = time.time()
+                return self._blob_path(digest)
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.objects_dir)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open_certificate(entry) as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            # Identical certificates share one blob
+            os.replace(tmp_path, self._blob_path(digest))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.entries[certificate_source(entry)] = {'mtime_ns': entry.mtime_ns, 'size': entry.size, 'digest': digest}
+            self.blobs[digest] = {'size': size, 'last_used': time.time()}
+            self._pinned.add(digest)
+            self._evict()
+        return self._blob_path(digest)
+
+    def _evict(self):
+        """Remove least recently used blobs until the mirror fits in max_bytes (lock held)."""
+        total = sum(blob['size'] for blob in self.blobs.values())
+        for digest in sorted(self.blobs, key=lambda d: self.blobs[d]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if digest in self._pinned:
+                continue
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+            total -= self.blobs.pop(digest)['size']
+        self.entries = {path: record for path, record in self.entries.items() if record['digest'] in self.blobs}
+
+    def prefetch(self, entries):
+        """Queue certificates to be copied into the mirror in the background."""
+        with self._lock:
+            for entry in entries:
+                source = certificate_source(entry)
+                if source not in self._pending:
+                    self._pending[source] = self._executor.submit(self._copy, entry)
+
+    def fetch(self, entry):
+        """Return the local path of the mirrored certificate, waiting for its copy if needed.
+
+        Returns None if the certificate could not be mirrored.
+        """
+        self.prefetch([entry])
+        try:
+            return self._pending[certificate_source(entry)].result()
+        except UNREADABLE_ERRORS:
+            return None
+
+    def read(self, entry):
+        """Return the certificate's bytes from the mirror, or straight from the share if it is not mirrored.
+
+        Returns empty bytes if the certificate cannot be read at all.
+        """
+        local_path = self.fetch(entry)
+        try:
+            if local_path is not None:
+                with open(local_path, 'rb') as file:
+                    return file.read()
+            return read_certificate(entry)
+        except UNREADABLE_ERRORS:
+            return b''
+
+    def close(self):
+        """Wait for outstanding copies, trim the mirror and save its index."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._pinned.clear()
+            self._evict()
+            try:
+                self._save_index()
+            except OSError:
+                pass  # The next run rebuilds what it needs
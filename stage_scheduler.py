@@ -0,0 +1,63 @@
+# stage_scheduler.py
+
+"""
+Concurrent execution of independent pipeline stages.
+
+The cleaning pipeline's input stages (Autogate parsing, DMS ingestion and
+certificate discovery) only wait on disk or the network share, so they run
+side by side on background threads and the caller joins on each result when
+it reaches the merge step. Wall time approaches the slowest stage instead of
+the sum of all of them.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+# ================================
+# Stage Scheduler
+# ================================
+
+class StageScheduler:
+    """Runs named stages concurrently, one worker thread per stage.
+
+    Workers are daemon threads, so a caller that returns early (for example
+    when its inputs are unchanged) does not wait for stages it no longer needs.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.durations = {}
+        self.started_at = None
+
+    def add(self, name, func, *args):
+        """Register a stage; it starts running when start() is called."""
+        self.stages[name] = (func, args, Future())
+        return self
+
+    def _run(self, name):
+        func, args, future = self.stages[name]
+        start = time.perf_counter()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self.durations[name] = time.perf_counter() - start
+
+    def start(self):
+        """Start every registered stage on its own worker thread."""
+        self.started_at = time.perf_counter()
+        for name in self.stages:
+            threading.Thread(target=self._run, args=(name,), name=f'stage-{name}', daemon=True).start()
+        return self
+
+    def result(self, name):
+        """Wait for a stage and return its result, re-raising its exception."""
+        return self.stages[name][2].result()
+
+    def report(self):
+        """Summarise the finished stages' durations against the elapsed wall time."""
+        wall = time.perf_counter() - self.started_at
+        stages = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.durations.items())
+        return f"Stages: {stages} (wall {wall:.2f}s)"
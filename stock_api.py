@@ -0,0 +1,266 @@
+# stock_api.py
+
+"""
+Read-only JSON API over the cleaned stock snapshot.
+
+Serves the same data and filters as the dashboard without going through
+Streamlit or opening the workbook per request. The result file is loaded
+once into memory by a background-refreshed SnapshotProvider; responses are
+cached per snapshot and query, carry an ETag so unchanged data costs a 304,
+and are gzip-compressed for clients that accept it. Only local files are
+read.
+
+Endpoints:
+    GET /stock   Vehicles matching the query parameters:
+                 make=ALL|BMW|KAW|KTM|OTHER, lams=1, create_listing=1,
+                 transfer_rego=1, stock_number=..., rego_number=...,
+                 sort_by=date_into_stock|rego_expiry|date_listed,
+                 order=newest|oldest, limit=N, offset=N
+    GET /meta    Snapshot path, modification time and vehicle count
+
+Usage:
+    python stock_api.py [port] [result_file]
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from stock_dates import format_date_column
+from stock_query import filter_positions, prepare_data
+from stock_snapshot import SnapshotProvider
+
+# ================================
+# Constants and Configuration
+# ================================
+
+RESULT_FILE = 'used_stock_data.xlsx'
+HOST = '0.0.0.0'
+PORT = 8502
+
+MAKE_OPTIONS = ["ALL", "BMW", "KAW", "KTM", "OTHER"]
+
+# API sort keys mapped to the dashboard's sort options
+SORT_OPTIONS = {
+    'date_into_stock': 'Date Into Stock',
+    'rego_expiry': 'Rego Expiry',
+    'date_listed': 'Date Listed',
+}
+ORDER_OPTIONS = {'newest': 'Newest first', 'oldest': 'Oldest first'}
+
+# Snapshot columns served, with their JSON field names
+API_COLUMNS = {
+    'Stock Number': 'stock_number',
+    'Date Into Stock_dt': 'date_into_stock',
+    'Make': 'make',
+    'Model': 'model',
+    'LAMS?': 'lams',
+    'VIN': 'vin',
+    'Rego Number': 'rego_number',
+    'Rego Expiry_dt': 'rego_expiry',
+    'Listed Price_num': 'listed_price',
+    'Date Listed_dt': 'date_listed',
+    'Status': 'status',
+}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+# Responses kept per (snapshot, query); old snapshots' entries age out
+RESPONSE_CACHE_SIZE = 256
+
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+# Added to the ETag of gzip bodies, so each encoding has its own strong validator
+GZIP_ETAG_SUFFIX = '-gzip'
+
+# ================================
+# Snapshot and Queries
+# ================================
+
+def prepare_api_data(file_path):
+    """Load the snapshot with its sort index and the JSON-ready record frame."""
+    df, sort_index = prepare_data(file_path)
+    records = df[list(API_COLUMNS)].rename(columns=API_COLUMNS)
+    for col in ['date_into_stock', 'rego_expiry', 'date_listed']:
+        records[col] = format_date_column(records[col], '%Y-%m-%d')
+    for col in records.columns.difference(['listed_price']):
+        records[col] = records[col].astype(str).str.strip()
+    return df, sort_index, records
+
+def parse_query(query_string):
+    """Validate the query parameters and return them as a normalized, hashable tuple.
+
+    Raises ValueError with a client-facing message for invalid parameters.
+    """
+    params = dict(parse_qsl(query_string))
+    make = params.get('make', 'ALL').upper()
+    if make not in MAKE_OPTIONS:
+        raise ValueError(f"make must be one of {', '.join(MAKE_OPTIONS)}")
+    sort_by = params.get('sort_by', 'date_into_stock')
+    if sort_by not in SORT_OPTIONS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_OPTIONS)}")
+    order = params.get('order', 'newest')
+    if order not in ORDER_OPTIONS:
+        raise ValueError(f"order must be one of {', '.join(ORDER_OPTIONS)}")
+    try:
+        limit = int(params['limit']) if 'limit' in params else None
+        offset = int(params.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("limit and offset must not be negative")
+    return (
+        make,
+        params.get('lams', '').lower() in TRUE_VALUES,
+        params.get('create_listing', '').lower() in TRUE_VALUES,
+        params.get('transfer_rego', '').lower() in TRUE_VALUES,
+        params.get('stock_number', '').strip(),
+        params.get('rego_number', '').strip(),
+        sort_by,
+        order,
+        limit,
+        offset,
+    )
+
+def query_stock(data, query):
+    """Run a parsed query against the snapshot data and return the response document."""
+    df, sort_index, records = data
+    (make, lams_only, create_listing_only, transfer_rego_only,
+     stock_number, rego_number, sort_by, order, limit, offset) = query
+    # Search terms are literal text, not patterns
+    positions = filter_positions(
+        df, sort_index, make, lams_only, create_listing_only, transfer_rego_only,
+        re.escape(stock_number), re.escape(rego_number), SORT_OPTIONS[sort_by], ORDER_OPTIONS[order]
+    )
+    page = positions[offset:] if limit is None else positions[offset:offset + limit]
+    vehicles = json.loads(records.iloc[page].to_json(orient='records'))
+    return {'total': len(positions), 'offset': offset, 'count': len(vehicles), 'vehicles': vehicles}
+
+# ================================
+# HTTP Service
+# ================================
+
+class StockAPI:
+    """Serves JSON responses from the current snapshot with a per-query response cache."""
+
+    def __init__(self, result_file=RESULT_FILE):
+        self.provider = SnapshotProvider(lambda: result_file, prepare_api_data).start()
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def response(self, path, query_string):
+        """Return (status, body, etag); successful bodies are encoded JSON, errors a dict without an ETag."""
+        snapshot = self.provider.get()
+        if snapshot is None:
+            return 503, {'error': 'stock snapshot not available'}, None
+        if path == '/meta':
+            document = {
+                'path': snapshot.path,
+                'modified': snapshot.modified.isoformat(timespec='seconds'),
+                'vehicles': len(snapshot.data[0]),
+            }
+            query = ('meta',)
+        elif path in ('/', '/stock'):
+            try:
+                query = parse_query(query_string)
+            except ValueError as e:
+                return 400, {'error': str(e)}, None
+            document = None
+        else:
+            return 404, {'error': 'not found'}, None
+
+        key = (snapshot.signature, path, query)
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+        if document is None:
+            document = query_stock(snapshot.data, query)
+            document['modified'] = snapshot.modified.isoformat(timespec='seconds')
+        body = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        cached = (200, body, etag)
+        with self._lock:
+            self._responses[key] = cached
+            while len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return cached
+
+def encoded_etag(etag, gzipped):
+    """Return the ETag for a body in the given encoding."""
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"' if gzipped else etag
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header lists the ETag in either encoding's form."""
+    for tag in if_none_match.split(','):
+        tag = tag.strip().removeprefix('W/')
+        if tag == '*' or tag == etag or tag == encoded_etag(etag, True):
+            return True
+    return False
+
+def make_handler(api):
+    """Build a request handler class bound to a StockAPI instance."""
+
+    class StockAPIHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body, etag = api.response(url.path.rstrip('/') or '/', url.query)
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode('utf-8')
+
+            gzipped = len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+            if etag is not None:
+                if etag_matches(self.headers.get('If-None-Match', ''), etag):
+                    self.send_response(304)
+                    self.send_header('ETag', encoded_etag(etag, gzipped))
+                    self.send_header('Content-Length', '0')
+                    self.send_header('Vary', 'Accept-Encoding')
+                    self.end_headers()
+                    return
+                etag = encoded_etag(etag, gzipped)
+
+            if gzipped:
+                body = gzip.compress(body, compresslevel=5)
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            if gzipped:
+                self.send_header('Content-Encoding', 'gzip')
+            if etag is not None:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StockAPIHandler
+
+def serve(port=PORT, result_file=RESULT_FILE, host=HOST):
+    """Run the API until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(StockAPI(result_file)))
+    print(f"Serving {result_file} on http://{host}:{port}/stock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    port_arg = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    file_arg = sys.argv[2] if len(sys.argv) > 2 else RESULT_FILE
+    serve(port_arg, file_arg)
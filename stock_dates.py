@@ -0,0 +1,74 @@
+# stock_dates.py
+
+"""
+Date normalization shared by the cleaning scripts, the history store and the
+dashboards.
+
+Every date source has a known format, so strings are parsed with explicit
+strptime formats instead of pandas inference. Parsed strings are memoized:
+the same few hundred dates repeat across rows, reruns and scripts, and a
+column is converted by parsing each distinct value once.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Dates written to the result workbooks (20-Sep-2024)
+RESULT_DATE_FORMAT = '%d-%b-%Y'
+
+# Expiry dates on rego certificates (19-04-2025)
+CERT_DATE_FORMAT = '%d-%m-%Y'
+
+# Stock-in dates in the DMS export (20/09/24)
+STOCK_DATE_FORMAT = '%d/%m/%y'
+
+# Formats accepted from result and Stock Status workbooks, tried in order
+DATE_FORMATS = (RESULT_DATE_FORMAT, CERT_DATE_FORMAT, '%d/%m/%Y', STOCK_DATE_FORMAT,
+                '%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+
+# Distinct date strings kept in the parse cache
+PARSE_CACHE_SIZE = 16384
+
+# ================================
+# Parsing
+# ================================
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_string(value, formats):
+    """Parse a date string with the first matching format, or return None."""
+    value = value.strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_date(value, formats=DATE_FORMATS):
+    """Return the value as a datetime, or None if it is missing or matches none of the formats."""
+    if isinstance(value, datetime):
+        return None if pd.isna(value) else value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    if isinstance(value, str):
+        return _parse_date_string(value, tuple(formats))
+    return None
+
+def parse_date_column(values, formats=DATE_FORMATS):
+    """Convert a column of date strings or date cells to datetime64, parsing each distinct value once."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    parsed = pd.DatetimeIndex([parse_date(value, formats) for value in uniques])
+    # Missing values have code -1 and are filled with NaT
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
+
+def format_date_column(values, fmt=RESULT_DATE_FORMAT):
+    """Format a datetime64 column as strings, with '' for missing dates."""
+    return values.dt.strftime(fmt).fillna('')
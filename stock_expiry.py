@@ -0,0 +1,152 @@
+# stock_expiry.py
+
+"""
+Sorted rego expiry index, expiry calendar and alert report.
+
+The index holds the snapshot's known rego expiry dates as one sorted
+datetime64 array with the stock position of each, so "expiring between A and
+B" is two binary searches and a slice. A per-day expiry calendar is counted
+once when the index is built, and the alert windows (by default expired, 7,
+30 and 60 days) are cut from the same array with one search per window edge
+instead of a scan of the frame per window.
+
+The cleaning pipeline writes the alert report next to the result workbook;
+the dashboard builds the index from the sort permutation it already stores
+for the Rego Expiry sort.
+
+Usage:
+    python stock_expiry.py [used_stock_data.xlsx] [days ...]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from stock_dates import parse_date_column
+from stock_status import EXPIRY_WARNING_DAYS
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Alert windows in days ahead; each vehicle is reported in the first window it falls in
+ALERT_WINDOWS = [7, EXPIRY_WARNING_DAYS, 60]
+
+EXPIRY_ALERTS_FILE = 'rego_expiry_alerts.xlsx'
+ALERTS_SHEET_NAME = 'Expiry Alerts'
+
+# Vehicle columns copied into the alert report
+REPORT_COLUMNS = ['Stock Number', 'Make', 'Model', 'Rego Number']
+
+# Sort option whose ascending permutation in a stock_query sort index orders the expiry dates
+SORT_OPTION = 'Rego Expiry'
+
+# ================================
+# Expiry Index
+# ================================
+
+def window_labels(windows=ALERT_WINDOWS):
+    """Label the expired group and each window by its day range ('1-7 days', '8-30 days', ...)."""
+    labels = ['Expired']
+    first = 1
+    for days in windows:
+        labels.append(f'{first}-{days} days')
+        first = days + 1
+    return labels
+
+class ExpiryIndex:
+    """Known rego expiry dates in ascending order with the stock position of each."""
+
+    def __init__(self, dates, positions):
+        self.dates = dates
+        self.positions = positions
+        days, counts = np.unique(dates.astype('datetime64[D]'), return_counts=True)
+        self.calendar = pd.Series(counts, index=pd.DatetimeIndex(days), name='Expiring')
+
+    @classmethod
+    def from_frame(cls, df, column='Rego Expiry'):
+        """Build the index from a frame's expiry column, using its parsed '_dt' column if it has one."""
+        values = df[column + '_dt'] if column + '_dt' in df.columns else df[column]
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            values = parse_date_column(values)
+        values = values.to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(values, kind='stable')  # NaT sorts last
+        return cls.from_order(values, order)
+
+    @classmethod
+    def from_sort_index(cls, df, sort_index):
+        """Build the index from the ascending Rego Expiry permutation of a stock_query sort index."""
+        values = df[f'{SORT_OPTION}_dt'].to_numpy(dtype='datetime64[ns]')
+        return cls.from_order(values, sort_index[SORT_OPTION]['Oldest first'])
+
+    @classmethod
+    def from_order(cls, values, order):
+        valid_count = len(order) - int(np.isnat(values).sum())
+        positions = order[:valid_count]
+        return cls(values[positions], positions)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def between(self, start, end):
+        """Return the positions of vehicles expiring from start to end (inclusive), soonest first."""
+        low = self.dates.searchsorted(np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        high = self.dates.searchsorted(np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        return self.positions[low:high]
+
+    def calendar_between(self, start, end):
+        """Return the per-day expiry counts from start to end (inclusive)."""
+        days = self.calendar.index
+        return self.calendar.iloc[days.searchsorted(pd.Timestamp(start), side='left'):
+                                  days.searchsorted(pd.Timestamp(end), side='right')]
+
+    def alert_windows(self, today=None, windows=ALERT_WINDOWS):
+        """Return [(label, positions, dates)] for expired regos and each window ahead of today.
+
+        A rego expiring today counts as expired, as in the status rules.
+        """
+        today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+        edges = np.array([today + pd.Timedelta(days=days) for days in [0, *sorted(windows)]], dtype='datetime64[ns]')
+        cuts = [0, *self.dates.searchsorted(edges, side='right')]
+        return [
+            (label, self.positions[low:high], self.dates[low:high])
+            for label, low, high in zip(window_labels(sorted(windows)), cuts, cuts[1:])
+        ]
+
+# ================================
+# Alert Report
+# ================================
+
+def alert_report(df, index, today=None, windows=ALERT_WINDOWS):
+    """Return one row per alerted vehicle with its window, expiry date and days left."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+    frames = []
+    for label, positions, dates in index.alert_windows(today, windows):
+        frame = df.iloc[positions][REPORT_COLUMNS].reset_index(drop=True)
+        frame.insert(0, 'Alert', label)
+        frame['Rego Expiry'] = dates
+        frames.append(frame)
+    report = pd.concat(frames, ignore_index=True)
+    report['Days Left'] = (report['Rego Expiry'] - today).dt.days
+    return report
+
+def write_expiry_alerts(df, path=EXPIRY_ALERTS_FILE, today=None, windows=ALERT_WINDOWS):
+    """Write the alert report for a cleaned stock frame and print the count per window."""
+    from stock_export import write_stock_workbook
+    report = alert_report(df, ExpiryIndex.from_frame(df), today, windows)
+    write_stock_workbook(report, path, sheet_name=ALERTS_SHEET_NAME)
+    counts = report['Alert'].value_counts()
+    summary = ', '.join(f"{label} {counts.get(label, 0)}" for label in window_labels(sorted(windows)))
+    print(f"Rego expiry alerts saved to {path} ({summary})")
+    return report
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    from stock_query import load_data
+    result_arg = sys.argv[1] if len(sys.argv) > 1 else 'used_stock_data.xlsx'
+    windows_arg = [int(arg) for arg in sys.argv[2:]] or ALERT_WINDOWS
+    write_expiry_alerts(load_data(result_arg), windows=windows_arg)
@@ -0,0 +1,148 @@
+# stock_export.py
+
+"""
+Formatted Excel export of the cleaned stock frame.
+
+The workbook is written with openpyxl's write-only mode, which streams rows
+to disk as they are produced instead of building the whole workbook in
+memory. Date and currency number formats, column widths, the header filter
+and the expired/expiring rego fills are applied in the same pass, so the
+file opens ready to use. The file is written under a temporary name and
+renamed into place, so readers never see a half-written workbook.
+"""
+
+import math
+import os
+from datetime import date
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from stock_status import EXPIRY_WARNING_DAYS
+
+# ================================
+# Constants and Configuration
+# ================================
+
+SHEET_NAME = 'Used Stock'
+
+DATE_NUMBER_FORMAT = 'dd-mmm-yyyy'
+CURRENCY_NUMBER_FORMAT = '"$"#,##0.00'
+
+# Number formats per column
+COLUMN_NUMBER_FORMATS = {
+    'Date Into Stock': DATE_NUMBER_FORMAT,
+    'Rego Expiry': DATE_NUMBER_FORMAT,
+    'Date Listed': DATE_NUMBER_FORMAT,
+    'Listed Price': CURRENCY_NUMBER_FORMAT,
+}
+
+# Columns written as numbers even when the frame holds them as text
+NUMERIC_COLUMNS = ['Listed Price']
+
+# Column widths in characters
+COLUMN_WIDTHS = {
+    'Stock Number': 13, 'Date Into Stock': 15, 'Make': 8, 'Model': 32, 'LAMS?': 7,
+    'VIN': 20, 'Rego Number': 12, 'Rego Expiry': 13, 'Rego Details': 24,
+    'Date Listed': 13, 'Listed Price': 13, 'Status': 28,
+    'Alert': 12, 'Days Left': 10,
+    'Search Views': 13, 'Detailed Views': 15, 'Lead Count': 11, 'Contact Watchers': 17, 'Health': 9, 'Photos': 9,
+}
+DEFAULT_COLUMN_WIDTH = 14
+
+# Rego expiry fills, matching the dashboard's badge colours
+EXPIRED_FILL = PatternFill(start_color='FF6347', end_color='FF6347', fill_type='solid')
+EXPIRING_FILL = PatternFill(start_color='FFA500', end_color='FFA500', fill_type='solid')
+
+HEADER_FONT = Font(bold=True)
+
+# ================================
+# Export
+# ================================
+
+def _cell_value(value):
+    """Convert a frame value to one openpyxl can write, with None for missing values."""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, str):
+        return value or None
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalars
+    return value
+
+def _formatted_value(value):
+    """True for values a number format applies to: numbers and dates, not text or booleans."""
+    return isinstance(value, (int, float, date)) and not isinstance(value, bool)
+
+def _expiry_rules(column, last_row):
+    """Conditional fills for expired and soon-to-expire rego dates in one column.
+
+    The limits match stock_status: a rego expiring today counts as expired.
+    """
+    cell = f'{column}2'
+    expired = FormulaRule(formula=[f'AND(ISNUMBER({cell}),{cell}<TODAY()+1)'], fill=EXPIRED_FILL, stopIfTrue=True)
+    expiring = FormulaRule(
+        formula=[f'AND(ISNUMBER({cell}),{cell}<TODAY()+{EXPIRY_WARNING_DAYS + 1})'],
+        fill=EXPIRING_FILL,
+    )
+    return f'{column}2:{column}{last_row}', [expired, expiring]
+
+def write_stock_workbook(df, path, sheet_name=SHEET_NAME):
+    """Stream the frame to a formatted xlsx file, one row at a time, replacing it atomically."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    # Numeric columns are coerced, so text such as '32990.0' is written as a number cell
+    numeric = [col for col in NUMERIC_COLUMNS if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])]
+    if numeric:
+        df = df.assign(**{col: pd.to_numeric(df[col], errors='coerce') for col in numeric})
+    columns = list(df.columns)
+    last_row = len(df) + 1
+    last_column = get_column_letter(max(len(columns), 1))
+
+    # Sheet layout has to be set before the first row is streamed
+    for i, col in enumerate(columns, start=1):
+        sheet.column_dimensions[get_column_letter(i)].width = COLUMN_WIDTHS.get(col, DEFAULT_COLUMN_WIDTH)
+    sheet.freeze_panes = 'A2'
+    sheet.auto_filter.ref = f'A1:{last_column}{last_row}'
+    if 'Rego Expiry' in columns and len(df):
+        cell_range, rules = _expiry_rules(get_column_letter(columns.index('Rego Expiry') + 1), last_row)
+        for rule in rules:
+            sheet.conditional_formatting.add(cell_range, rule)
+
+    # Header row
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(sheet, value=col)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    sheet.append(header)
+
+    # Data rows; only formatted columns need styled cells
+    number_formats = [COLUMN_NUMBER_FORMATS.get(col) for col in columns]
+    for values in df.itertuples(index=False, name=None):
+        row = []
+        for value, number_format in zip(values, number_formats):
+            value = _cell_value(value)
+            if number_format is not None and _formatted_value(value):
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.number_format = number_format
+                row.append(cell)
+            else:
+                row.append(value)
+        sheet.append(row)
+
+    tmp_path = f'{path}.tmp'
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
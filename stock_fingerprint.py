@@ -0,0 +1,102 @@
+# stock_fingerprint.py
+
+"""
+Run fingerprints for the cleaning scripts.
+
+A run's inputs (the DMS and Autogate exports, the certificate catalogue and
+the run date) and its cleaned output frame are each reduced to a SHA-256
+fingerprint and recorded next to the result workbook. A run whose inputs
+match the recorded ones, with the workbook untouched since, can return
+straight away; a run whose output matches is not written again, so the
+dashboards do not reload an identical workbook.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from stock_snapshot import file_signature
+
+# ================================
+# Constants and Configuration
+# ================================
+
+FINGERPRINT_SUFFIX = '.fingerprint.json'
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# ================================
+# Fingerprints
+# ================================
+
+def file_digest(path):
+    """Return the SHA-256 of a file's content, or None if it does not exist."""
+    hasher = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+    except FileNotFoundError:
+        return None
+    return hasher.hexdigest()
+
+def input_fingerprint(input_files, catalogue, run_date):
+    """Fingerprint a run's input files, its certificate catalogue and the run date.
+
+    Certificates are identified by their catalogue signature (path, member,
+    mtime and size) rather than their content, which would mean reading the share.
+    """
+    hasher = hashlib.sha256()
+    for path in input_files:
+        hasher.update(f'{path}={file_digest(path)}\n'.encode())
+    for entry in sorted(catalogue):
+        hasher.update(f'{entry.path}|{entry.member}|{entry.mtime_ns}|{entry.size}\n'.encode())
+    hasher.update(run_date.isoformat().encode())
+    return hasher.hexdigest()
+
+def frame_fingerprint(df):
+    """Fingerprint a frame's columns, dtypes and values."""
+    hasher = hashlib.sha256()
+    hasher.update(repr([(col, str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+# ================================
+# Recorded Runs
+# ================================
+
+def fingerprint_path(result_file):
+    return f'{result_file}{FINGERPRINT_SUFFIX}'
+
+def load_fingerprints(result_file):
+    """Return the fingerprints recorded for a result file, or an empty dict."""
+    try:
+        with open(fingerprint_path(result_file), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_fingerprints(result_file, inputs, output):
+    """Record a run's fingerprints along with the result file's current signature."""
+    path = fingerprint_path(result_file)
+    tmp_path = f'{path}.tmp'
+    record = {'inputs': inputs, 'output': output, 'result_signature': file_signature(result_file)}
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(record, file)
+    os.replace(tmp_path, path)
+
+def result_is_current(result_file, inputs):
+    """True if the last run had these inputs and the result file has not changed since."""
+    record = load_fingerprints(result_file)
+    signature = file_signature(result_file)
+    return (record.get('inputs') == inputs and signature is not None
+            and list(signature) == record.get('result_signature'))
+
+def output_is_current(result_file, output):
+    """True if the result file already holds a frame with this fingerprint."""
+    record = load_fingerprints(result_file)
+    signature = file_signature(result_file)
+    return (record.get('output') == output and signature is not None
+            and list(signature) == record.get('result_signature'))
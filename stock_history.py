@@ -0,0 +1,231 @@
+# stock_history.py
+
+"""
+Multi-day stock history store and aging aggregates.
+
+Each daily cleaned stock frame is written once to an append-only Parquet
+partition (history/snapshot_date=YYYY-MM-DD/stock.parquet). Small daily
+aggregate tables are updated at ingest time so trend views read only those
+and never rescan the raw history. Snapshots carrying the Autogate listing
+metrics also feed a listing-performance table of views and leads per make
+and days-listed bucket.
+
+Usage:
+    python stock_history.py used_stock_data.xlsx [DD-MM-YYYY]
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from stock_dates import RESULT_DATE_FORMAT, parse_date_column
+from stock_schema import LISTING_METRIC_COLUMNS, apply_schema
+
+# ================================
+# Constants and Configuration
+# ================================
+
+HISTORY_DIR = 'history'
+AGGREGATES_DIR = os.path.join(HISTORY_DIR, 'aggregates')
+
+# Columns kept in each history partition
+HISTORY_COLUMNS = ['Stock Number', 'Date Into Stock', 'Stock Type', 'Make', 'Model', 'VIN',
+                   'Rego Number', 'LAMS?', 'Date Listed', 'Listed Price', 'Status'] + LISTING_METRIC_COLUMNS
+
+# Days-in-stock and days-listed buckets: (upper bound in days, label)
+AGE_BUCKETS = [(30, '0-30'), (60, '31-60'), (90, '61-90'), (180, '91-180'), (float('inf'), '180+')]
+
+# Makes with their own series; everything else is grouped as OTHER
+TRACKED_MAKES = ['BMW', 'KAW', 'KTM']
+
+# Aggregate tables and their file names
+AGGREGATE_TABLES = {
+    'aging': 'days_in_stock.parquet',
+    'listing': 'time_to_listing.parquet',
+    'makes': 'make_counts.parquet',
+    'performance': 'listing_performance.parquet',
+}
+
+# Listing metrics summed per make and days-listed bucket: {aggregate column: snapshot column}
+PERFORMANCE_SUMS = {
+    'Search Views': 'Search Views',
+    'Detailed Views': 'Detailed Views',
+    'Leads': 'Lead Count',
+    'Watchers': 'Contact Watchers',
+}
+
+# ================================
+# Partition Helpers
+# ================================
+
+def partition_path(snapshot_date):
+    """Return the Parquet file path for a snapshot date."""
+    return os.path.join(HISTORY_DIR, f'snapshot_date={snapshot_date:%Y-%m-%d}', 'stock.parquet')
+
+def snapshot_dates():
+    """List the snapshot dates stored in the history, oldest first."""
+    if not os.path.isdir(HISTORY_DIR):
+        return []
+    dates = []
+    for name in os.listdir(HISTORY_DIR):
+        if name.startswith('snapshot_date='):
+            dates.append(datetime.strptime(name.split('=', 1)[1], '%Y-%m-%d').date())
+    return sorted(dates)
+
+def write_parquet_atomic(df, path):
+    """Write a Parquet file through a temporary file so readers never see a partial write."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def normalize_snapshot(df):
+    """Return the history columns with typed dates and prices and the compact stock dtypes."""
+    df = df[[col for col in HISTORY_COLUMNS if col in df.columns]].copy()
+    for col in ['Date Into Stock', 'Date Listed']:
+        if col in df.columns:
+            df[col] = parse_date_column(df[col], [RESULT_DATE_FORMAT])
+    if 'Listed Price' in df.columns:
+        df['Listed Price'] = pd.to_numeric(df['Listed Price'], errors='coerce')
+    return apply_schema(df)
+
+# ================================
+# Daily Aggregates
+# ================================
+
+def age_buckets(days):
+    """Bucket a series of day counts into the AGE_BUCKETS labels."""
+    bounds = [-1] + [upper for upper, _ in AGE_BUCKETS]
+    return pd.cut(days, bins=bounds, labels=[label for _, label in AGE_BUCKETS])
+
+def compute_listing_performance(df, snapshot_ts, make):
+    """Sum the listing metrics of listed vehicles per make and days-listed bucket.
+
+    Per-day rates divide summed views by summed days listed (a vehicle listed
+    today counts as one day); leads are per 1,000 detailed views.
+    """
+    listed = df['Date Listed'].notna()
+    days_listed = (snapshot_ts - df.loc[listed, 'Date Listed']).dt.days
+    frame = pd.DataFrame({
+        'Make': make[listed],
+        'Bucket': age_buckets(days_listed),
+        'Days Listed': days_listed.clip(lower=1),
+        **{name: df.loc[listed, col] for name, col in PERFORMANCE_SUMS.items()},
+    })
+    performance = frame.groupby(['Make', 'Bucket'], observed=True).agg(
+        Listings=('Days Listed', 'size'),
+        **{name: (name, 'sum') for name in ['Days Listed', *PERFORMANCE_SUMS]},
+    ).astype('int64').reset_index()
+
+    days = performance['Days Listed'].astype('float64')
+    detailed = performance['Detailed Views'].astype('float64')
+    performance['Search Views Per Day'] = performance['Search Views'] / days
+    performance['Detailed Views Per Day'] = detailed / days
+    performance['Leads Per 1k Views'] = 1000 * performance['Leads'] / detailed.where(detailed > 0)
+    performance['Bucket'] = performance['Bucket'].astype(str)
+    performance.insert(0, 'Snapshot Date', snapshot_ts)
+    return performance
+
+def compute_daily_aggregates(df, snapshot_date):
+    """Compute the aggregate rows for one normalized snapshot."""
+    snapshot_ts = pd.Timestamp(snapshot_date)
+    days_in_stock = (snapshot_ts - df['Date Into Stock']).dt.days
+
+    # Days-in-stock distribution
+    labels = [label for _, label in AGE_BUCKETS]
+    buckets = age_buckets(days_in_stock)
+    aging = buckets.value_counts().reindex(labels, fill_value=0).rename_axis('Bucket').reset_index(name='Count')
+    aging.insert(0, 'Snapshot Date', snapshot_ts)
+
+    # Time from stock-in to listing
+    days_to_list = (df['Date Listed'] - df['Date Into Stock']).dt.days
+    listed = days_to_list.notna()
+    listing = pd.DataFrame({
+        'Snapshot Date': [snapshot_ts],
+        'In Stock': [len(df)],
+        'Listed': [int(listed.sum())],
+        'Unlisted': [int((~listed).sum())],
+        'Median Days To List': [days_to_list.median()],
+        'Mean Days To List': [days_to_list.mean()],
+        'Median Days In Stock': [days_in_stock.median()],
+    })
+
+    # Per-make counts
+    make = df['Make'].str.upper().where(df['Make'].str.upper().isin(TRACKED_MAKES), 'OTHER')
+    makes = make.value_counts().rename_axis('Make').reset_index(name='Count')
+    makes.insert(0, 'Snapshot Date', snapshot_ts)
+
+    daily = {'aging': aging, 'listing': listing, 'makes': makes}
+
+    # Listing performance, for snapshots that carry the listing metrics
+    if all(col in df.columns for col in PERFORMANCE_SUMS.values()):
+        daily['performance'] = compute_listing_performance(df, snapshot_ts, make)
+    return daily
+
+def load_aggregates():
+    """Load every aggregate table, returning empty frames for missing ones."""
+    aggregates = {}
+    for name, file_name in AGGREGATE_TABLES.items():
+        path = os.path.join(AGGREGATES_DIR, file_name)
+        aggregates[name] = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    return aggregates
+
+def update_aggregates(daily, snapshot_date):
+    """Replace one day's rows in each aggregate table with freshly computed ones."""
+    snapshot_ts = pd.Timestamp(snapshot_date)
+    existing = load_aggregates()
+    for name, rows in daily.items():
+        table = existing[name]
+        if not table.empty:
+            table = table[table['Snapshot Date'] != snapshot_ts]
+        table = pd.concat([table, rows], ignore_index=True).sort_values('Snapshot Date', kind='stable')
+        write_parquet_atomic(table, os.path.join(AGGREGATES_DIR, AGGREGATE_TABLES[name]))
+
+# ================================
+# Ingestion
+# ================================
+
+def ingest_snapshot(df, snapshot_date=None):
+    """Store a cleaned stock frame as the given day's partition and update the aggregates.
+
+    Re-ingesting the same day replaces that day's partition; other days are never touched.
+    """
+    if snapshot_date is None:
+        snapshot_date = datetime.now()
+    if isinstance(snapshot_date, datetime):
+        snapshot_date = snapshot_date.date()
+    snapshot = normalize_snapshot(df)
+    write_parquet_atomic(snapshot, partition_path(snapshot_date))
+    update_aggregates(compute_daily_aggregates(snapshot, snapshot_date), snapshot_date)
+    print(f"Stock history updated for {snapshot_date:%d-%m-%Y} ({len(snapshot)} vehicles)")
+
+def ingest_result_file(file_path, snapshot_date=None):
+    """Ingest a cleaned result workbook, dated by its modification time unless given."""
+    if snapshot_date is None:
+        snapshot_date = datetime.fromtimestamp(os.path.getmtime(file_path)).date()
+    ingest_snapshot(pd.read_excel(file_path), snapshot_date)
+
+def load_history(start=None, end=None):
+    """Load the raw partitions between two dates (inclusive) with a Snapshot Date column."""
+    frames = []
+    for snapshot_date in snapshot_dates():
+        if (start and snapshot_date < start) or (end and snapshot_date > end):
+            continue
+        frame = pd.read_parquet(partition_path(snapshot_date))
+        frame.insert(0, 'Snapshot Date', pd.Timestamp(snapshot_date))
+        frames.append(frame)
+    # Categories differ between days, so re-apply the schema to the combined frame
+    return apply_schema(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    date_arg = datetime.strptime(sys.argv[2], '%d-%m-%Y').date() if len(sys.argv) > 2 else None
+    ingest_result_file(sys.argv[1], date_arg)
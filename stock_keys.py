@@ -0,0 +1,51 @@
+# stock_keys.py
+
+"""
+Canonical VIN and plate keys for lookups and merges.
+
+The DMS export, the Autogate export and the certificate file names spell the
+same VIN or plate in different ways (case, spacing, dashes), and the DMS
+reuses placeholder plates such as CAP across vehicles. Every lookup and merge
+goes through the canonical keys produced here, so each distinct vehicle or
+plate is looked up once and its result is fanned back out to every stock
+record that shares it.
+"""
+
+import pandas as pd
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Longest plate the DMS holds for a registered vehicle; longer values are VIN fragments
+MAX_PLATE_LENGTH = 5
+
+# Values entered in the rego field for vehicles without a plate of their own
+PLATE_PLACEHOLDERS = {'CAP', 'TBA', 'TBC', 'NIL', 'NA', 'NONE', 'UNREG', 'UNREGO'}
+
+# Characters dropped from keys
+KEY_SEPARATORS = r'[\s\-\.]'
+
+# ================================
+# Canonical Keys
+# ================================
+
+def canonical_vins(values):
+    """Upper-case VINs with spacing and separators removed; missing VINs become ''."""
+    return values.fillna('').astype(str).str.replace(KEY_SEPARATORS, '', regex=True).str.upper()
+
+def canonical_plates(values):
+    """Upper-case plates with separators removed; placeholders and non-plates become ''."""
+    plates = values.fillna('').astype(str).str.replace(KEY_SEPARATORS, '', regex=True).str.upper()
+    invalid = (plates.str.len() > MAX_PLATE_LENGTH) | plates.isin(PLATE_PLACEHOLDERS)
+    return plates.mask(invalid, '')
+
+def unique_keys(keys):
+    """The distinct non-empty keys, in first-seen order."""
+    return [key for key in pd.unique(keys) if key]
+
+def latest_per_vin(df, date_column):
+    """Keep one record per VIN, the one with the latest date; records without a VIN are dropped."""
+    df = df[df['VIN'] != '']
+    latest = df.sort_values(date_column, ascending=False, kind='stable', na_position='last')
+    return latest.drop_duplicates('VIN').sort_index()
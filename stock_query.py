@@ -0,0 +1,154 @@
+# stock_query.py
+
+"""
+Loading and filtering of the cleaned stock snapshot.
+
+Shared by the Streamlit dashboard and the JSON API so both apply exactly the
+same make, LAMS, status and search filters. Loading parses the dates and
+prices and evaluates the status rules once, and stores a sort permutation
+per sort option; a query is then a boolean mask, with bitwise status tests,
+intersected with the stored permutation.
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_dates import format_date_column, parse_date_column
+from stock_schema import apply_schema
+from stock_status import CREATE_LISTING, FLAGS_COLUMN, TRANSFER_REGO, status_flags, stored_flags, unevaluated_rules
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Sort options mapped to the parsed columns they sort on
+SORT_COLUMNS = {
+    'Date Into Stock': 'Date Into Stock_dt',
+    'Rego Expiry': 'Rego Expiry_dt',
+    'Date Listed': 'Date Listed_dt',
+}
+
+# ================================
+# Loading
+# ================================
+
+def load_data(file_path):
+    """Load data from the specified Excel file with the compact stock dtypes."""
+    return apply_schema(pd.read_excel(file_path))
+
+def preprocess_data(df):
+    """Preprocess the DataFrame by converting columns and checking for required columns."""
+    required_columns = ['Stock Number', 'Date Into Stock', 'Make', 'Model', 'VIN', 'LAMS?',
+                        'Rego Number', 'Rego Expiry', 'Listed Price', 'Date Listed', 'Status']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing columns in the dataset: {', '.join(missing_columns)}")
+    else:
+        # Convert date columns
+        date_columns = ['Date Into Stock', 'Rego Expiry', 'Date Listed']
+        for col in date_columns:
+            df[col + '_dt'] = parse_date_column(df[col])
+            # Workbooks with real date cells are shown like the text dates
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = format_date_column(df[col])
+        # Convert price to numeric
+        df['Listed Price_num'] = pd.to_numeric(df['Listed Price'], errors='coerce')
+        # Evaluate the day-independent status rules into bit flags
+        flags = stored_flags(df)
+        # Workbooks without 'Rego Details' only record the transfer flag in the Status text
+        missing_rules = unevaluated_rules(df)
+        if missing_rules:
+            flags |= status_flags(df['Status'], missing_rules)
+        df[FLAGS_COLUMN] = flags
+        return df
+
+def build_sort_index(df):
+    """Compute a stored argsort permutation per sort option and order.
+
+    Both orders are stable sorts, so rows with equal dates keep their workbook
+    order, and missing dates are kept at the end, matching sort_values.
+    """
+    sort_index = {}
+    for sort_by, sort_col in SORT_COLUMNS.items():
+        values = df[sort_col].to_numpy()
+        ascending = np.argsort(values, kind='stable')  # NaT sorts last
+        # Sort on the negated dates, with missing dates as a secondary key placing them last
+        missing = np.isnat(values)
+        negated = np.where(missing, 0, -values.view('i8'))
+        descending = np.lexsort((negated, missing))
+        sort_index[sort_by] = {
+            "Oldest first": ascending,
+            "Newest first": descending,
+        }
+    return sort_index
+
+def prepare_data(file_path):
+    """Load and preprocess the data once, returning it with its sort index."""
+    df = preprocess_data(load_data(file_path))
+    return df, build_sort_index(df)
+
+# ================================
+# Filtering
+# ================================
+
+def filter_positions(df, sort_index, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number, sort_by, sort_order, counts=None):
+    """Return the row positions matching the filters and search, in sorted order.
+
+    If counts is a dict, the rows remaining after each applied filter are recorded in it.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    
+    def record(step):
+        if counts is not None:
+            counts[step] = int(mask.sum())
+    
+    record('All rows')
+    
+    # ----------------------------
+    # Apply Filtering
+    # ----------------------------
+    
+    # Filter by Make
+    if selected_make != "ALL":
+        if selected_make == "OTHER":
+            mask &= ~df['Make'].str.contains('BMW|KAW|KTM', case=False, na=False).to_numpy()
+        else:
+            mask &= df['Make'].str.contains(selected_make, case=False, na=False).to_numpy()
+        record(f'Make {selected_make}')
+    
+    # Filter by LAMS Approved
+    if lams_only:
+        mask &= (df['LAMS?'].str.strip().str.lower() == 'yes').to_numpy()
+        record('LAMS only')
+    
+    # Filter for Create Listing Only
+    if create_listing_only:
+        mask &= (df[FLAGS_COLUMN].to_numpy() & CREATE_LISTING) != 0
+        record('Create listing')
+    
+    # Filter for Transfer Rego Only
+    if transfer_rego_only:
+        mask &= (df[FLAGS_COLUMN].to_numpy() & TRANSFER_REGO) != 0
+        record('Transfer rego')
+    
+    # ----------------------------
+    # Apply Search
+    # ----------------------------
+    
+    if stock_number:
+        mask &= df['Stock Number'].astype(str).str.contains(stock_number, case=False, na=False).to_numpy()
+        record('Stock search')
+    
+    if rego_number:
+        mask &= df['Rego Number'].astype(str).str.contains(rego_number, case=False, na=False).to_numpy()
+        record('Rego search')
+    
+    # ----------------------------
+    # Apply Sorting
+    # ----------------------------
+    
+    # Intersect the mask with the stored permutation instead of re-sorting
+    if sort_by in sort_index:
+        permutation = sort_index[sort_by][sort_order]
+        return permutation[mask[permutation]]
+    return np.flatnonzero(mask)
@@ -0,0 +1,99 @@
+# stock_schema.py
+
+"""
+Compact column dtypes for the stock frame.
+
+Low-cardinality text columns are stored as categoricals, identifier-like
+text as Arrow-backed strings, prices and the Autogate listing metrics as
+nullable integers and floats, so the frame is a fraction of its object-dtype
+size and every copy of it is cheaper. The same schema is applied when a
+snapshot is cleaned, when it is stored in the history and when the dashboard
+loads it.
+
+Usage:
+    python stock_schema.py used_stock_data.xlsx
+"""
+
+import sys
+
+import pandas as pd
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# A handful of distinct values repeated across every vehicle
+CATEGORY_COLUMNS = ['Make', 'Stock Type', 'LAMS?', 'Status', 'Rego Details']
+
+# Mostly unique identifiers and descriptions
+STRING_COLUMNS = ['Stock Number', 'VIN', 'Model', 'Rego Number']
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+
+# Autogate listing metrics: counts as nullable integers, the health score as a float
+COUNT_COLUMNS = ['Search Views', 'Detailed Views', 'Lead Count', 'Contact Watchers', 'Photos']
+SCORE_COLUMNS = ['Health']
+LISTING_METRIC_COLUMNS = COUNT_COLUMNS + SCORE_COLUMNS
+
+# Prices, which arrive as object columns of floats mixed with pd.NA
+PRICE_COLUMNS = ['Listed Price']
+
+# Columns coerced to float64, missing or unparseable values becoming NaN
+FLOAT_COLUMNS = PRICE_COLUMNS + SCORE_COLUMNS
+
+# Inferred types of object columns that hold text, possibly mixed with other values
+TEXT_INFERRED_TYPES = {'string', 'empty', 'mixed', 'mixed-integer'}
+
+# ================================
+# Schema
+# ================================
+
+def is_text(values):
+    """True for object or string columns holding text, rather than numbers or dates stored as objects."""
+    if pd.api.types.is_string_dtype(values) and not pd.api.types.is_object_dtype(values):
+        return True
+    return pd.api.types.is_object_dtype(values) and pd.api.types.infer_dtype(values, skipna=True) in TEXT_INFERRED_TYPES
+
+def apply_schema(df):
+    """Return a copy of the frame with the compact stock dtypes.
+
+    Missing values in text columns become empty strings, matching what the
+    dashboards expect; other columns that are not text are left as they are.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].fillna('').astype(str).astype('category')
+        elif col in STRING_COLUMNS:
+            df[col] = df[col].fillna('').astype(str).astype(STRING_DTYPE)
+        elif col in COUNT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int32')
+        elif col in FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif is_text(df[col]):
+            df[col] = df[col].fillna('').astype(str)
+    return df
+
+def memory_report(before, after):
+    """Compare the deep memory usage of a frame before and after the schema, per column."""
+    report = pd.DataFrame({
+        'Before dtype': before.dtypes.astype(str),
+        'After dtype': after.dtypes.reindex(before.columns).astype(str),
+        'Before (KB)': before.memory_usage(index=False, deep=True) / 1024,
+        'After (KB)': after.memory_usage(index=False, deep=True).reindex(before.columns) / 1024,
+    })
+    report.loc['Total'] = ['', '', report['Before (KB)'].sum(), report['After (KB)'].sum()]
+    report['Ratio'] = report['Before (KB)'] / report['After (KB)']
+    return report.round(1)
+
+# ================================
+# Main Execution
+# ================================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    original = pd.read_excel(sys.argv[1])
+    # Baseline is the frame the dashboard used to hold: everything filled with ''
+    print(memory_report(original.fillna('').astype(object), apply_schema(original)).to_string())
@@ -0,0 +1,143 @@
+# stock_snapshot.py
+
+"""
+Background-refreshed data snapshots for the dashboards.
+
+A SnapshotProvider polls the modification time of a result workbook, loads
+new or modified files on a background thread and swaps the loaded snapshot
+in atomically, so readers never block on an Excel read after the first load.
+Providers are shared process-wide, so a provider warmed up before the first
+dashboard session is the one every session reads from.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Seconds between modification-time checks
+POLL_INTERVAL = 30
+
+# A loaded result file: where it came from, its file signature and the loaded data
+Snapshot = namedtuple('Snapshot', ['path', 'signature', 'modified', 'loaded_at', 'data'])
+
+# Process-wide providers, keyed by file path and loader
+_shared_providers = {}
+_shared_lock = threading.Lock()
+
+# ================================
+# Snapshot Provider
+# ================================
+
+def file_signature(path):
+    """Return a (mtime_ns, size) signature for the file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SnapshotProvider:
+    """Keeps the latest loaded snapshot of a result file up to date in the background.
+
+    resolve_path is called on every poll so date-stamped file names roll over
+    to the new day's file; load is called with the path and returns the data.
+    """
+
+    def __init__(self, resolve_path, load, poll_interval=POLL_INTERVAL):
+        self.resolve_path = resolve_path
+        self.load = load
+        self.poll_interval = poll_interval
+        self.snapshot = None
+        self.error = None
+        # The resolved path while it does not exist yet (e.g. the new day's file after midnight)
+        self.missing_path = None
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the background polling thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-poller', daemon=True)
+            self._thread.start()
+        return self
+
+    def get(self):
+        """Return the current snapshot, loading synchronously only if none exists yet."""
+        if self.snapshot is None:
+            self.refresh()
+        return self.snapshot
+
+    def refresh(self):
+        """Load the result file if it is new or modified and swap the snapshot in.
+
+        Returns True if a new snapshot was published.
+        """
+        with self._refresh_lock:
+            path = self.resolve_path()
+            signature = file_signature(path)
+            current = self.snapshot
+            self.missing_path = path if signature is None else None
+            if signature is None:
+                return False
+            if current is not None and current.path == path and current.signature == signature:
+                return False
+            try:
+                data = self.load(path)
+            except Exception as e:
+                # Keep serving the previous snapshot; the file may be mid-write
+                self.error = e
+                return False
+            # Skip publishing if the file changed again while it was being read
+            if file_signature(path) != signature:
+                return False
+            self.error = None
+            # Rebinding the attribute is atomic, so readers see the old or new snapshot whole
+            self.snapshot = Snapshot(
+                path=path,
+                signature=signature,
+                modified=datetime.fromtimestamp(signature[0] / 1e9),
+                loaded_at=datetime.now(),
+                data=data,
+            )
+            return True
+
+    def is_stale(self):
+        """True if a snapshot is being served while the file it should come from does not exist."""
+        return self.snapshot is not None and self.missing_path is not None and self.missing_path != self.snapshot.path
+
+    def _run(self):
+        """Poll for changes until the process exits; a failed poll is logged and retried."""
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error = e
+                print(f"[snapshot] Poll failed: {e!r}")
+
+
+def shared_provider(file_path, load):
+    """Return the process-wide started provider for a file and loader, creating it on first use.
+
+    file_path may also be a function returning the path, called on every poll
+    so date-stamped file names roll over.
+    """
+    if callable(file_path):
+        resolve_path = file_path
+        path_key = (file_path.__module__, file_path.__qualname__)
+    else:
+        resolve_path = lambda: file_path
+        path_key = os.path.abspath(file_path)
+    key = (path_key, load.__module__, load.__qualname__)
+    with _shared_lock:
+        provider = _shared_providers.get(key)
+        if provider is None:
+            provider = _shared_providers[key] = SnapshotProvider(resolve_path, load).start()
+    return provider
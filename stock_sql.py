@@ -0,0 +1,182 @@
+# stock_sql.py
+
+"""
+Optional SQLite query backend for the stock dashboard.
+
+The snapshot's filter and sort columns are copied into an in-memory SQLite
+table keyed by row position, and each dashboard rerun becomes two
+parameterized queries: a COUNT for the pager and one page of positions
+fetched with LIMIT/OFFSET. The rendered rows still come from the loaded
+frame, so both backends show exactly the same table.
+
+Filters match filter_positions in stock_query. Make and status choices are
+resolved against the snapshot's distinct makes and flag values when the
+table is built, so the queries test Make and Status Flags with IN lists that
+their indexes serve; sort orders are the stored permutations of the sort
+index, kept as indexed rank columns the paging query walks in order.
+Searches without regex characters use LIKE, others a REGEXP function, as
+pandas treats the search text as a regular expression.
+
+Enabled for the dashboard with DASHBOARD_BACKEND=sqlite.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from stock_query import SORT_COLUMNS, prepare_data
+from stock_status import CREATE_LISTING, FLAGS_COLUMN, TRANSFER_REGO
+
+# ================================
+# Constants and Configuration
+# ================================
+
+# Environment variable choosing the dashboard's query backend ('pandas' or 'sqlite')
+BACKEND_ENV = 'DASHBOARD_BACKEND'
+
+TABLE = 'stock'
+
+# Characters that make a search term a regular expression rather than plain text
+REGEX_CHARACTERS = set('.^$*+?{}[]\\|()')
+
+# Makes the OTHER choice excludes
+TRACKED_MAKES = 'BMW|KAW|KTM'
+
+# Indexed columns: the filters, the searches and one rank per sort option and order
+INDEXED_COLUMNS = ['make', 'flags', 'stock_number', 'rego_number']
+
+# ================================
+# Table Building
+# ================================
+
+def rank_column(sort_by, sort_order):
+    """Name of the column holding each row's rank in a sort option's order."""
+    return 'rank_' + re.sub(r'\W+', '_', f'{sort_by} {sort_order}'.lower())
+
+def _regexp(pattern, value):
+    return value is not None and re.search(pattern, value, re.IGNORECASE) is not None
+
+def _like_pattern(term):
+    """Escape LIKE wildcards and match the term anywhere in the value."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+class StockDatabase:
+    """In-memory SQLite copy of a snapshot's filter and sort columns.
+
+    The connection is shared by every dashboard session, so queries are
+    serialized by a lock; each one only touches an index and a page of rows.
+    """
+
+    def __init__(self, df, sort_index):
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.create_function('REGEXP', 2, _regexp, deterministic=True)
+
+        table = pd.DataFrame({
+            'pos': np.arange(len(df)),
+            'make': df['Make'].astype(str).to_numpy(),
+            'lams': df['LAMS?'].astype(str).str.strip().str.lower().to_numpy(),
+            'flags': df[FLAGS_COLUMN].to_numpy(),
+            'stock_number': df['Stock Number'].astype(str).to_numpy(),
+            'rego_number': df['Rego Number'].astype(str).to_numpy(),
+        })
+        for sort_by, orders in sort_index.items():
+            for sort_order, permutation in orders.items():
+                ranks = np.empty(len(df), dtype=np.int64)
+                ranks[permutation] = np.arange(len(df))
+                table[rank_column(sort_by, sort_order)] = ranks
+        self.rank_columns = [col for col in table.columns if col.startswith('rank_')]
+
+        with self.connection:
+            self.connection.execute(
+                f'CREATE TABLE {TABLE} (pos INTEGER PRIMARY KEY, make TEXT, lams TEXT, flags INTEGER, '
+                f'stock_number TEXT, rego_number TEXT, {", ".join(f"{col} INTEGER" for col in self.rank_columns)})'
+            )
+            self.connection.executemany(
+                f'INSERT INTO {TABLE} VALUES ({", ".join("?" * len(table.columns))})',
+                table.itertuples(index=False, name=None),
+            )
+            for col in INDEXED_COLUMNS + self.rank_columns:
+                self.connection.execute(f'CREATE INDEX {TABLE}_{col} ON {TABLE} ({col})')
+            self.connection.execute('ANALYZE')
+
+        # Distinct values the make and status choices are resolved against
+        self.makes = sorted(table['make'].unique())
+        self.flag_values = sorted(int(value) for value in table['flags'].unique())
+
+    # ----------------------------
+    # Query Translation
+    # ----------------------------
+
+    def where_clause(self, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number):
+        """Translate the sidebar choices into a WHERE clause and its parameters."""
+        conditions = []
+        params = []
+
+        def member_of(column, values):
+            conditions.append(f'{column} IN ({", ".join("?" * len(values))})' if values else '0')
+            params.extend(values)
+
+        if selected_make != "ALL":
+            if selected_make == "OTHER":
+                member_of('make', [make for make in self.makes if not re.search(TRACKED_MAKES, make, re.IGNORECASE)])
+            else:
+                member_of('make', [make for make in self.makes if re.search(selected_make, make, re.IGNORECASE)])
+        if lams_only:
+            conditions.append('lams = ?')
+            params.append('yes')
+        if create_listing_only:
+            member_of('flags', [value for value in self.flag_values if value & CREATE_LISTING])
+        if transfer_rego_only:
+            member_of('flags', [value for value in self.flag_values if value & TRANSFER_REGO])
+        for column, term in [('stock_number', stock_number), ('rego_number', rego_number)]:
+            if not term:
+                continue
+            if REGEX_CHARACTERS.intersection(term):
+                conditions.append(f'{column} REGEXP ?')
+                params.append(term)
+            else:
+                conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(term))
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def execute(self, sql, params):
+        with self._lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def count(self, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number, sort_by=None, sort_order=None):
+        """Return the number of rows matching the filters and search; the sort arguments are ignored."""
+        where, params = self.where_clause(selected_make, lams_only, create_listing_only,
+                                          transfer_rego_only, stock_number, rego_number)
+        return self.execute(f'SELECT COUNT(*) FROM {TABLE}{where}', params)[0][0]
+
+    def positions(self, selected_make, lams_only, create_listing_only, transfer_rego_only, stock_number, rego_number, sort_by, sort_order, limit=None, offset=0):
+        """Return one page of the matching row positions in sorted order, like filter_positions sliced."""
+        where, params = self.where_clause(selected_make, lams_only, create_listing_only,
+                                          transfer_rego_only, stock_number, rego_number)
+        order = f' ORDER BY {rank_column(sort_by, sort_order)}' if sort_by in SORT_COLUMNS else ' ORDER BY pos'
+        rows = self.execute(f'SELECT pos FROM {TABLE}{where}{order} LIMIT ? OFFSET ?',
+                            params + [-1 if limit is None else limit, offset])
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+# ================================
+# Loading
+# ================================
+
+def prepare_sql_data(file_path):
+    """Load the snapshot like prepare_data and build its SQLite query table."""
+    df, sort_index = prepare_data(file_path)
+    return df, sort_index, StockDatabase(df, sort_index)
+
+def snapshot_loader():
+    """Return the snapshot load function for the backend chosen in the environment."""
+    return prepare_sql_data if os.environ.get(BACKEND_ENV, 'pandas').lower() == 'sqlite' else prepare_data
@@ -0,0 +1,152 @@
+# stock_status.py
+
+"""
+Declarative stock status rules compiled to bit flags.
+
+Each rule names a condition on a vehicle's fields and owns one bit of an
+integer flag column. compile_rules turns a rule set into a single function
+that evaluates every condition as a vectorized boolean mask over the frame
+and packs the masks into the flags, so the cleaning scripts derive the Status
+text from one pass and the dashboards filter and render with bitwise tests
+instead of scanning strings.
+
+Rules marked dated depend on the current day (rego expiry, stock age); they
+are evaluated for the day they are shown rather than stored with a snapshot.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# ================================
+# Constants and Configuration
+# ================================
+
+TRANSFER_REGO = 1 << 0
+CHECK_REGO_NUMBER = 1 << 1
+CREATE_LISTING = 1 << 2
+REGO_EXPIRED = 1 << 3
+EXPIRES_SOON = 1 << 4
+ADD_PRICE = 1 << 5
+AGED_STOCK = 1 << 6
+
+# Rego expiring within this many days is flagged
+EXPIRY_WARNING_DAYS = 30
+
+# Stock held longer than this many days is flagged
+AGED_STOCK_DAYS = 120
+
+# Column holding the packed flags
+FLAGS_COLUMN = 'Status Flags'
+
+# Rule fields; parsed '_dt' and '_num' columns are used when a frame has them
+PARSED_SUFFIXES = ['_dt', '_num', '']
+
+# ================================
+# Rules
+# ================================
+
+# name: label in the Status text and badges; flag: its bit; fields: columns the
+# condition reads; condition(fields, today): boolean array; in_status: written
+# to the Status text; dated: depends on the current day
+StatusRule = namedtuple('StatusRule', ['name', 'flag', 'fields', 'condition', 'in_status', 'dated'])
+
+def _present(values):
+    """True where a text value is neither missing nor blank."""
+    return (values.astype('string').str.strip().fillna('') != '').to_numpy(dtype=bool)
+
+def _before(values, limit):
+    """True where a date is before the limit; missing dates are never before it."""
+    return (values < limit).fillna(False).to_numpy(dtype=bool)
+
+def _expiry_limit(today):
+    # Expiry dates carry no time, so a rego expiring today counts as expired
+    return today + pd.Timedelta(days=1)
+
+STATUS_RULES = [
+    StatusRule('Transfer rego', TRANSFER_REGO, ('Rego Details',),
+               lambda f, today: _present(f['Rego Details']), in_status=True, dated=False),
+    StatusRule('Check rego number', CHECK_REGO_NUMBER, ('Rego Number',),
+               lambda f, today: ~_present(f['Rego Number']), in_status=False, dated=False),
+    StatusRule('Create listing', CREATE_LISTING, ('Date Listed',),
+               lambda f, today: f['Date Listed'].isna().to_numpy(dtype=bool), in_status=True, dated=False),
+    StatusRule('Add price', ADD_PRICE, ('Date Listed', 'Listed Price'),
+               lambda f, today: (f['Date Listed'].notna() & f['Listed Price'].isna()).to_numpy(dtype=bool),
+               in_status=False, dated=False),
+    StatusRule('Expired', REGO_EXPIRED, ('Rego Expiry',),
+               lambda f, today: _before(f['Rego Expiry'], _expiry_limit(today)), in_status=False, dated=True),
+    StatusRule('Expires soon', EXPIRES_SOON, ('Rego Expiry',),
+               lambda f, today: (~_before(f['Rego Expiry'], _expiry_limit(today))
+                                 & _before(f['Rego Expiry'], _expiry_limit(today) + pd.Timedelta(days=EXPIRY_WARNING_DAYS))),
+               in_status=False, dated=True),
+    StatusRule('Aged stock', AGED_STOCK, ('Date Into Stock',),
+               lambda f, today: _before(f['Date Into Stock'], today - pd.Timedelta(days=AGED_STOCK_DAYS)),
+               in_status=False, dated=True),
+]
+
+STORED_RULES = [rule for rule in STATUS_RULES if not rule.dated]
+DATED_RULES = [rule for rule in STATUS_RULES if rule.dated]
+
+# ================================
+# Compilation
+# ================================
+
+def rule_fields(df, names):
+    """Map each field name to the frame's parsed column for it, skipping fields the frame lacks."""
+    fields = {}
+    for name in names:
+        for suffix in PARSED_SUFFIXES:
+            if name + suffix in df.columns:
+                fields[name] = df[name + suffix]
+                break
+    return fields
+
+def compile_rules(rules):
+    """Compile a rule set into one function returning the packed flags of a frame's rows.
+
+    The returned function takes the frame and optionally the day to evaluate
+    dated rules for (default today). Rules whose fields the frame lacks are
+    skipped, so their flags stay clear.
+    """
+    plan = [(rule.flag, rule.fields, rule.condition) for rule in rules]
+    names = sorted({name for rule in rules for name in rule.fields})
+
+    def evaluate(df, today=None):
+        today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+        fields = rule_fields(df, names)
+        flags = np.zeros(len(df), dtype=np.int64)
+        for flag, needed, condition in plan:
+            if all(name in fields for name in needed):
+                flags[condition(fields, today)] |= flag
+        return flags
+
+    return evaluate
+
+stored_flags = compile_rules(STORED_RULES)
+dated_flags = compile_rules(DATED_RULES)
+
+# ================================
+# Status Text
+# ================================
+
+def status_text(flags, rules=STATUS_RULES):
+    """Join the names of each row's set Status-text rules with '; '."""
+    text_rules = [rule for rule in rules if rule.in_status]
+    values, inverse = np.unique(np.asarray(flags), return_inverse=True)
+    labels = np.array(['; '.join(rule.name for rule in text_rules if value & rule.flag) for value in values], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+def status_flags(status, rules=STATUS_RULES):
+    """Read the Status-text rules' flags back from a Status column, the inverse of status_text."""
+    text_rules = [rule for rule in rules if rule.in_status]
+    codes, uniques = pd.factorize(pd.Series(status))
+    values = [sum(rule.flag for rule in text_rules if rule.name in {part.strip() for part in str(value).split(';')})
+              for value in uniques]
+    # Missing values have code -1 and take the trailing 0
+    return np.array(values + [0], dtype=np.int64)[codes]
+
+def unevaluated_rules(df, rules=STORED_RULES):
+    """Return the Status-text rules whose fields the frame lacks, so stored_flags leaves them clear."""
+    return [rule for rule in rules if rule.in_status and len(rule_fields(df, rule.fields)) < len(rule.fields)]
+
@@ -10,11 +10,12 @@ import os
 import re
 from datetime import datetime, timedelta
 
+from functools import lru_cache
+
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+
+from stock_dates import parse_date_column
+from stock_status import status_text, stored_flags
 
 # ================================
 # Constants and Configuration
@@ -31,10 +32,11 @@ USED_STOCK_DATA_FILE = os.path.join(RAW_DATA_DIR, f'Stock{DATE.strftime("%d%m%y"
 RESULT_FILE = 'used_stock_data_test.xlsx'
 
 # Selenium Configuration
-SELENIUM_OPTIONS = Options()
-SELENIUM_OPTIONS.add_argument('--headless')  # Run in headless mode
-SELENIUM_OPTIONS.add_argument('--disable-gpu')
-SELENIUM_OPTIONS.add_argument('--no-sandbox')
+SELENIUM_ARGUMENTS = [
+    '--headless',  # Run in headless mode
+    '--disable-gpu',
+    '--no-sandbox',
+]
 
 # Maximum number of worker threads for Selenium
 MAX_WORKERS = 5  # Adjust based on system capabilities
@@ -76,9 +78,22 @@ def extract_price(price_str):
 # Selenium WebDriver Setup
 # ================================
 
+@lru_cache(maxsize=None)
+def selenium_options():
+    """Build the Chrome options on first use; Selenium is only imported by runs that look up regos."""
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    for argument in SELENIUM_ARGUMENTS:
+        options.add_argument(argument)
+    return options
+
 def extract_rego_info(rego_number):
     """Extracts registration expiry date and LA condition from NSW vehicle registration."""
-    driver = webdriver.Chrome(options=SELENIUM_OPTIONS)
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException
+
+    driver = webdriver.Chrome(options=selenium_options())
 
     try:
         # Navigate to the NSW vehicle registration page
@@ -210,6 +225,8 @@ def clean_autogate_data():
 # ================================
 def clean_used_stock_data(autogate_df, rego_limit=None):
     """Cleans the Used Stock data and updates it directly with rego information."""
+    from stock_export import write_stock_workbook
+    
     df = pd.read_csv(USED_STOCK_DATA_FILE, delimiter=',')
     
     # Filter for 'For Sale' status and rename columns
@@ -270,20 +287,19 @@ def clean_used_stock_data(autogate_df, rego_limit=None):
         df.loc[df['Rego Number'] == rego, 'Rego Expiry'] = info['expiry_date'].strftime('%d-%b-%Y') if isinstance(info['expiry_date'], datetime) else ''
     
     # Read and process Autogate data
-    autogate_df['Date Listed'] = pd.to_datetime(autogate_df['Date Listed'], errors='coerce')
+    autogate_df['Date Listed'] = parse_date_column(autogate_df['Date Listed'])
     
     # Merge Autogate data with Used Stock data on 'VIN'
     df = df.merge(autogate_df, on='VIN', how='left')
     
-    # Create 'Status' column
-    df['Status'] = df['Date Listed'].isna().map({True: 'Create listing', False: ''})
+    # Create 'Status' column from the status rules
+    df['Status'] = status_text(stored_flags(df))
     
-    # Format date columns
-    df['Date Into Stock'] = df['Date Into Stock'].dt.strftime('%d-%b-%Y')
-    df['Date Listed'] = df['Date Listed'].dt.strftime('%d-%b-%Y').fillna('')
+    # Dates stay datetimes; the workbook applies the date format
+    df['Rego Expiry'] = parse_date_column(df['Rego Expiry'])
     
-    # Save to Excel
-    df.to_excel(RESULT_FILE, index=False)
+    # Save to Excel with date and currency formats
+    write_stock_workbook(df, RESULT_FILE)
     
     print(f"Used stock data cleaned and saved to {RESULT_FILE}")
 